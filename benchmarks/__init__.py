@@ -0,0 +1,88 @@
+"""Benchmark suite for the bibliographic database, its containers, the
+crawlers parsers and text cleaning.
+
+Benchmarks are registered with the @benchmark decorator on a setup function
+taking a scale factor and returning (run, ops): `run` is a no argument
+callable performing `ops` operations. Setup is called again before each
+repetition so that benchmarks mutating their inputs (eg. PubDB.add_pub)
+always start from the same state.
+
+Benchmarks measuring something else than the wall time of run() (eg. the
+`-X importtime` of a subprocess) are registered with self_timed=True: run()
+returns the seconds to record. A benchmark with a `budget` fails the run
+when its best time is over it.
+
+Run with `python -m benchmarks --help`.
+"""
+from collections import OrderedDict
+import gc
+import time
+import tracemalloc
+
+__all__ = ['benchmark', 'registry', 'run_benchmark']
+
+registry = OrderedDict()
+
+def benchmark(name, budget=None, self_timed=False):
+    """Register a benchmark setup function under `name`, with a `budget` in
+    seconds for its best time. If `self_timed`, run() returns its own
+    measure of the seconds taken.
+    """
+    def decorator(setup):
+        if name in registry:
+            raise ValueError('Duplicated benchmark name %r' % name)
+        setup.budget = budget
+        setup.self_timed = self_timed
+        registry[name] = setup
+        return setup
+    return decorator
+
+
+def _timed(setup, scale):
+    run, ops = setup(scale)
+    gc.collect()
+    gc.disable()
+    try:
+        t0 = time.perf_counter()
+        measured = run()
+        elapsed = time.perf_counter() - t0
+    finally:
+        gc.enable()
+    return (measured if setup.self_timed else elapsed), ops
+
+
+def run_benchmark(name, scale=1, repeat=5, memory=True):
+    """Run a registered benchmark, returning a JSON serializable dict.
+
+    Timings are taken with tracing disabled; peak memory is measured with
+    tracemalloc on a separate run since tracing slows down allocations.
+    """
+    setup = registry[name]
+    times = []
+    for i in range(repeat):
+        elapsed, ops = _timed(setup, scale)
+        times.append(elapsed)
+
+    best = min(times)
+    result = {
+        'ops': ops,
+        'best_s': best,
+        'mean_s': sum(times) / len(times),
+        'ops_per_s': ops / best if best > 0 else float('inf'),
+        'repeat': repeat,
+    }
+    if setup.budget is not None:
+        result['budget_s'] = setup.budget
+        result['over_budget'] = best > setup.budget
+
+    if memory:
+        run, ops = setup(scale)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return result
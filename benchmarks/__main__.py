@@ -0,0 +1,133 @@
+"""Run the benchmark suite and record or compare machine-readable results.
+
+    python -m benchmarks --output results-$(git rev-parse --short HEAD).json
+    python -m benchmarks bibdb. lattice.dedupset_authors --scale 2
+    python -m benchmarks --compare results-old.json results-new.json
+"""
+import argparse
+from datetime import datetime
+import fnmatch
+import json
+import logging
+import platform
+import subprocess
+import sys
+
+from benchmarks import registry, run_benchmark
+from benchmarks import (bench_bibdb, bench_columnar, bench_corpus_stats, bench_crawlers,
+                        bench_imports, bench_lattice, bench_text_cleaning)
+
+logger = logging.getLogger('benchmarks')
+
+
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + '-dirty' if dirty else rev
+
+
+def select(patterns):
+    if not patterns:
+        return list(registry)
+    return [name for name in registry
+            if any(name.startswith(p) or fnmatch.fnmatch(name, p) for p in patterns)]
+
+
+def run(args):
+    "Run the selected benchmarks, returning the exit status: 1 if any is over budget"
+    results = {}
+    over_budget = []
+    for name in select(args.benchmarks):
+        try:
+            result = run_benchmark(name, scale=args.scale, repeat=args.repeat,
+                                   memory=not args.no_memory)
+        except (ImportError, LookupError) as e:
+            # Missing optional dependency or NLTK data
+            # (NLTK messages are framed by lines of stars)
+            reason = next((line.strip() for line in str(e).splitlines() if any(c.isalpha() for c in line)), '')
+            logger.warning('Skipping %s: %s', name, reason)
+            continue
+        results[name] = result
+        print('%-35s %12.1f ops/s %10.2f MiB' % (name, result['ops_per_s'],
+                                                 result.get('peak_bytes', 0) / 2**20))
+        if result.get('over_budget'):
+            logger.error('%s took %.3fs, budget is %.3fs', name, result['best_s'], result['budget_s'])
+            over_budget.append(name)
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'date': datetime.now().isoformat(),
+            'python': sys.version,
+            'platform': platform.platform(),
+            'scale': args.scale,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if over_budget:
+        logger.error('Over budget: %s', ', '.join(over_budget))
+        return 1
+    return 0
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    if old['meta']['scale'] != new['meta']['scale']:
+        logger.warning('Comparing results with different scales')
+
+    print('%s -> %s' % (old['meta']['revision'], new['meta']['revision']))
+    print('%-35s %12s %12s %8s %10s' % ('benchmark', 'old ops/s', 'new ops/s', 'speedup', 'mem ratio'))
+    for name, new_result in new['results'].items():
+        old_result = old['results'].get(name)
+        if old_result is None:
+            continue
+        speedup = new_result['ops_per_s'] / old_result['ops_per_s']
+        if old_result.get('peak_bytes') and new_result.get('peak_bytes'):
+            mem = '%10.2f' % (new_result['peak_bytes'] / old_result['peak_bytes'])
+        else:
+            mem = '%10s' % '-'
+        print('%-35s %12.1f %12.1f %7.2fx %s' % (name, old_result['ops_per_s'],
+                                                  new_result['ops_per_s'], speedup, mem))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmarks', nargs='*',
+                        help='benchmark names, prefixes or glob patterns (default: all)')
+    parser.add_argument('--scale', type=int, default=1, help='size multiplier of the corpora')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--no-memory', action='store_true', help='skip peak memory measurement')
+    parser.add_argument('--output', '-o', help='write results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two JSON result files')
+    parser.add_argument('--list', action='store_true', help='list benchmarks')
+    parser.add_argument('--log-level', default='ERROR',
+                        help='bibdb logs every merge, which is noisy at the default level')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level)
+    logger.setLevel(logging.WARNING)
+
+    if args.list:
+        for name in select(args.benchmarks):
+            print(name)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+from benchmarks import benchmark
+from benchmarks import synthetic
+
+from bibdb import Author, Publication, PubDB, normalize_name, cached_normalize_name
+from lattice_containers import DeduplicatedKeysDict
+
+
+@benchmark('bibdb.author_init_tuples')
+def author_init_tuples(scale):
+    "Author(lname, fname, initials) as in PubMed records"
+    names = synthetic.author_tuples(20000 * scale)
+    cached_normalize_name.cache_clear()
+    return lambda: [Author(*name) for name in names], len(names)
+
+
+@benchmark('bibdb.author_init_fullnames')
+def author_init_fullnames(scale):
+    "Author(full_name) as in HAL records"
+    names = synthetic.author_names(20000 * scale)
+    cached_normalize_name.cache_clear()
+    return lambda: [Author(name) for name in names], len(names)
+
+
+@benchmark('bibdb.author_normalize_uncached')
+def author_normalize_uncached(scale):
+    "Baseline for the Author constructors: name normalization without cache"
+    names = synthetic.author_tuples(20000 * scale)
+    return lambda: [normalize_name(*name) for name in names], len(names)
+
+
+@benchmark('bibdb.author_from_many_tuples')
+def author_from_many_tuples(scale):
+    names = synthetic.author_tuples(20000 * scale)
+    cached_normalize_name.cache_clear()
+    return lambda: Author.from_many(names), len(names)
+
+
+@benchmark('bibdb.author_from_many_fullnames')
+def author_from_many_fullnames(scale):
+    names = synthetic.author_names(20000 * scale)
+    cached_normalize_name.cache_clear()
+    return lambda: Author.from_many(names), len(names)
+
+
+@benchmark('bibdb.publication_init')
+def publication_init(scale):
+    records = synthetic.publication_records(2000 * scale)
+    return lambda: [synthetic.build_publication(record) for record in records], len(records)
+
+
+@benchmark('bibdb.pubdb_add_pub')
+def pubdb_add_pub(scale):
+    "PubDB.add_pub with ~30% of duplicated publications"
+    records = synthetic.publication_records(2000 * scale)
+    pubs = [synthetic.build_publication(record) for record in records]
+    def run():
+        pdb = PubDB()
+        for pub in pubs:
+            pdb.add_pub(pub)
+    return run, len(pubs)
+
+
+@benchmark('bibdb.abstract_refs_index')
+def abstract_refs_index(scale):
+    "Index the abstract refs of new Publications, as PubDB.ref2pub, then look them up again"
+    abstracts = [record['abstract'] for record in synthetic.publication_records(2000 * scale, dup_rate=0)
+                 if record['abstract']]
+    # Lookups are done with equal but distinct strings, as with duplicated records
+    copies = [''.join(list(abstract)) for abstract in abstracts]
+    def run():
+        ref2pub = DeduplicatedKeysDict()
+        for abstract in abstracts:
+            pub = Publication('ART', [], None, [], en_abstract=abstract)
+            ref2pub.update({ref: pub for ref in pub.refs})
+        for abstract in copies:
+            for ref in Publication('ART', [], None, [], en_abstract=abstract).refs:
+                ref2pub.get(ref)
+    return run, 2 * len(abstracts)
+
+
+@benchmark('bibdb.disambiguate')
+def disambiguate(scale):
+    "Batch author disambiguation in the calling process, per author mention"
+    from disambiguation import disambiguate
+    pdb = PubDB()
+    for record in synthetic.publication_records(2000 * scale):
+        pdb.add_pub(synthetic.build_publication(record))
+    pubs = {id(pub): pub for pubs in pdb.author_pubs.values() for pub in pubs}
+    return lambda: disambiguate(pdb, workers=1), sum(len(pub.author_mentions) for pub in pubs.values())
+
+
+def _efetch_bodies(scale):
+    from benchmarks import stubs
+    records = synthetic.publication_records(2000 * scale, seed=1)
+    return list(stubs.pubmed_responses(records, full=True)[1].values())
+
+
+@benchmark('bibdb.ingest_pubmed_xml')
+def ingest_pubmed_xml(scale):
+    "ingest() of full efetch responses, parsed in worker processes (one per CPU)"
+    from crawlers.pubmed import parse_xml
+    from ingest import ingest
+    bodies = _efetch_bodies(scale)
+    return lambda: ingest(PubDB(), bodies, parse_xml), len(bodies)
+
+
+@benchmark('bibdb.ingest_pubmed_xml_sequential')
+def ingest_pubmed_xml_sequential(scale):
+    "Baseline for ingest(): full efetch responses parsed and added in the calling process"
+    from crawlers.pubmed import parse_xml
+    from ingest import ingest
+    bodies = _efetch_bodies(scale)
+    return lambda: ingest(PubDB(), bodies, parse_xml, workers=1), len(bodies)
@@ -0,0 +1,39 @@
+from benchmarks import benchmark
+from benchmarks import synthetic
+
+from bibdb import PubDB
+
+
+def _pubdb(scale):
+    pdb = PubDB()
+    for record in synthetic.publication_records(2000 * scale):
+        pdb.add_pub(synthetic.build_publication(record))
+    return pdb
+
+
+@benchmark('columnar.freeze')
+def freeze(scale):
+    import numpy
+    pdb = _pubdb(scale)
+    return pdb.freeze, len(pdb.ref2pub)
+
+
+@benchmark('columnar.select')
+def select(scale):
+    "Vectorized filters, to compare with a loop over the Publications"
+    frozen = _pubdb(scale).freeze()
+    authors = list(range(0, frozen.nauthors, 10))
+    def run():
+        for i in range(100):
+            frozen.select(years=(2000, 2010), pubtypes=['ART', 'COMM'],
+                          authors=authors, has_abstract=True)
+    return run, 100
+
+
+@benchmark('columnar.export')
+def export(scale):
+    "Streaming export, to compare with freeze().save()"
+    import tempfile
+    pdb = _pubdb(scale)
+    dirname = tempfile.mkdtemp()
+    return lambda: pdb.export(dirname), len(pdb.ref2pub)
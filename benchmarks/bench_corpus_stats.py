@@ -0,0 +1,28 @@
+import random
+
+from benchmarks import benchmark
+from benchmarks import synthetic
+
+
+def _documents(scale):
+    rnd = random.Random(0)
+    return [synthetic.abstract(rnd).split() for i in range(1000 * scale)]
+
+
+@benchmark('corpus_stats.term_matrix')
+def term_matrix(scale):
+    from corpus_stats import TermMatrix
+    documents = _documents(scale)
+    return lambda: TermMatrix.from_documents(documents), len(documents)
+
+
+@benchmark('corpus_stats.filter_extremes')
+def filter_extremes(scale):
+    "Pruning with several thresholds, without another pass over the documents"
+    from corpus_stats import TermMatrix
+    tm = TermMatrix.from_documents(_documents(scale))
+    thresholds = [(no_below, no_above) for no_below in (2, 5, 10) for no_above in (0.1, 0.25, 0.5)]
+    def run():
+        for no_below, no_above in thresholds:
+            tm.filter_extremes(no_below, no_above, keep_n=None).to_csc()
+    return run, len(thresholds)
@@ -0,0 +1,122 @@
+"""Crawlers parsing, fed with synthetic responses through a local stub.
+
+The synthetic records all include a same target author, so the crawlers
+filtering on the searched author keeps them.
+
+crawlers.replay_recorded replays the searches of recorded responses instead:
+an HTTPCache pickle or a response archive (see replay), named by the
+BENCH_RESPONSES environment variable (default: http_cache.pk). It is skipped
+when there is no such file.
+"""
+import gzip
+import os
+import tempfile
+from xml.etree import ElementTree as ET
+
+from benchmarks import benchmark
+from benchmarks import synthetic
+from benchmarks.stubs import (ReplayGet, RoutedGet, hal_response, pubmed_article,
+                              pubmed_responses, recorded_searches)
+
+from bibdb import Author
+
+target = ('Peterlongo', 'Pierre', 'P')
+
+
+def _records(scale, homonyms=0):
+    "Records of the target author, except a `homonyms` fraction of them"
+    records = synthetic.publication_records(500 * scale, dup_rate=0)
+    for i, record in enumerate(records):
+        authors = [name for name in record['authors'] if name[0] != target[0]]
+        if i >= homonyms * len(records):
+            authors.insert(0, target)
+        else:
+            authors.insert(0, (target[0], 'Paul', 'P'))
+        record['authors'] = authors
+    return records
+
+
+@benchmark('crawlers.hal_authorsearch')
+def hal_authorsearch(scale):
+    from crawlers import hal_authorsearch
+    records = _records(scale)
+    get = RoutedGet(hal={None: hal_response(records)})
+    author = Author(*target)
+    return lambda: list(hal_authorsearch(get, author)), len(records)
+
+
+@benchmark('crawlers.pubmed_authorsearch')
+def pubmed_authorsearch(scale):
+    from crawlers import pubmed_authorsearch
+    records = _records(scale)[:399] # esearch skips authors with 400 results or more
+    esearch, efetch = pubmed_responses(records)
+    get = RoutedGet(esearch={None: esearch}, efetch=efetch)
+    author = Author(*target)
+    return lambda: list(pubmed_authorsearch(get, author)), len(records)
+
+
+@benchmark('crawlers.pubmed_homonyms')
+def pubmed_homonyms(scale, lazy=False):
+    "PubMed search where half of the results are from an homonym"
+    from crawlers import pubmed_authorsearch
+    records = _records(scale, homonyms=0.5)[:399]
+    esearch, efetch = pubmed_responses(records)
+    get = RoutedGet(esearch={None: esearch}, efetch=efetch)
+    author = Author(*target)
+    return lambda: [pub.materialize() if lazy else pub
+                    for pub in pubmed_authorsearch(get, author, lazy=lazy)], len(records)
+
+
+@benchmark('crawlers.pubmed_homonyms_lazy')
+def pubmed_homonyms_lazy(scale):
+    "Same as crawlers.pubmed_homonyms, but with LazyPublications"
+    return pubmed_homonyms(scale, lazy=True)
+
+
+@benchmark('crawlers.pubmed_baseline_file')
+def pubmed_baseline_file(scale):
+    "Streaming import of a baseline file, where 10% of the articles are from the target"
+    from crawlers.pubmed_baseline import AuthorIndex, import_file
+    records = synthetic.publication_records(5000 * scale, dup_rate=0)
+    for record in records[::10]:
+        record['authors'] = [target] + record['authors']
+    root = ET.Element('PubmedArticleSet')
+    for i, record in enumerate(records):
+        root.append(pubmed_article(record, str(30000000 + i)))
+    fd, file_name = tempfile.mkstemp(suffix='.xml.gz')
+    with os.fdopen(fd, 'wb') as f, gzip.open(f, 'wb') as gz:
+        gz.write(ET.tostring(root, encoding='utf-8'))
+    index = AuthorIndex([Author(*target)])
+    def run():
+        try:
+            import_file(file_name, index)
+        finally:
+            os.remove(file_name)
+    return run, len(records)
+
+
+@benchmark('crawlers.replay_recorded')
+def replay_recorded(scale):
+    "Author searches of recorded HAL and PubMed responses (the scale is ignored)"
+    from crawlers import hal_authorsearch, pubmed_authorsearch
+    from replay import MissingResponse
+    file_name = os.environ.get('BENCH_RESPONSES', 'http_cache.pk')
+    if not os.path.exists(file_name):
+        raise LookupError('No recorded responses in %r' % file_name)
+    if file_name.endswith('.pk'):
+        get = ReplayGet.from_http_cache(file_name)
+        urls = get.responses
+    else:
+        from replay import ResponseArchive
+        archive = ResponseArchive(file_name)
+        get = archive.get
+        urls = archive.urls()
+    searches = recorded_searches(urls)
+    search = {'hal': hal_authorsearch, 'pubmed': pubmed_authorsearch}
+    def run():
+        for source, author in searches:
+            try:
+                list(search[source](get, author))
+            except MissingResponse:
+                pass # Some responses of the search were not recorded
+    return run, len(searches)
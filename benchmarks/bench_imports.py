@@ -0,0 +1,55 @@
+"""Import time of the modules loaded by worker processes, measured in a new
+interpreter with `python -X importtime` (cumulative time of the module,
+excluding the interpreter startup).
+
+    python -m benchmarks.bench_imports
+
+checks them against IMPORT_BUDGETS and exits with an error status when one
+is over budget. The imports.* benchmarks record these seconds, not the
+subprocess wall time, and fail `python -m benchmarks` the same way.
+"""
+import subprocess
+import sys
+
+from benchmarks import benchmark
+
+# Seconds
+IMPORT_BUDGETS = {
+    'bibdb': 0.05,
+    'crawlers': 0.05,
+    'text_cleaning': 0.05,
+}
+
+
+def import_time(module):
+    "Seconds taken by `import module` in a new interpreter"
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                          capture_output=True, text=True, check=True)
+    for line in proc.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2].strip() == module:
+            return int(fields[1]) / 1e6
+    raise RuntimeError('No import time reported for %r' % module)
+
+
+def _register(module):
+    @benchmark('imports.' + module, budget=IMPORT_BUDGETS[module], self_timed=True)
+    def setup(scale):
+        return lambda: import_time(module), 1
+
+for module in IMPORT_BUDGETS:
+    _register(module)
+
+
+def main():
+    over_budget = False
+    for module, budget in IMPORT_BUDGETS.items():
+        seconds = min(import_time(module) for i in range(3))
+        status = 'ok' if seconds <= budget else 'OVER BUDGET'
+        over_budget |= seconds > budget
+        print('%-20s %8.3fs  budget %6.3fs  %s' % (module, seconds, budget, status))
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+from benchmarks import benchmark
+from benchmarks import synthetic
+
+from bibdb import Author, PubDB, RefJournal
+from lattice_containers import DeduplicatedSet, DeduplicatedKeysDict, DeduplicatedKeysDictOfSets
+
+
+@benchmark('lattice.dedupset_authors')
+def dedupset_authors(scale):
+    "DeduplicatedSet.update on authors with colliding surnames"
+    authors = [Author(*name) for name in synthetic.author_tuples(5000 * scale)]
+    return lambda: DeduplicatedSet(authors), len(authors)
+
+
+@benchmark('lattice.dictofsets_authors')
+def dictofsets_authors(scale):
+    "DeduplicatedKeysDictOfSets.update, as done for PubDB.author_pubs"
+    authors = [Author(*name) for name in synthetic.author_tuples(5000 * scale)]
+    items = [(author, i // 8) for i, author in enumerate(authors)]
+    return lambda: DeduplicatedKeysDictOfSets().update(items), len(items)
+
+
+@benchmark('lattice.dict_journal_refs')
+def dict_journal_refs(scale):
+    "DeduplicatedKeysDict lookups in a single big journal bucket"
+    refs = []
+    for i in range(1000 * scale):
+        pstart = 1 + 10 * i
+        refs.append(RefJournal('Bioinformatics', '1367-4803', str(1 + i % 12), str(30 + i // 300),
+                               '%d-%d' % (pstart, pstart + 8)))
+    def run():
+        d = DeduplicatedKeysDict()
+        for i, ref in enumerate(refs):
+            d[ref] = i
+        for ref in refs:
+            d.get(ref)
+    return run, 2 * len(refs)
+
+
+class HashedRefJournal(RefJournal):
+    "RefJournal kept in the hash table of DeduplicatedSet, as before IntervalIndex"
+    interval_block = None
+
+
+def _journal_issue_pubdb(records, hashed=False):
+    pdb = PubDB()
+    for record in records:
+        pub = synthetic.build_publication(record)
+        if hashed:
+            for ref in pub.refs:
+                if type(ref) is RefJournal:
+                    ref.__class__ = HashedRefJournal
+        pdb.add_pub(pub)
+    return pdb
+
+
+def _merged_titles(pdb):
+    pubs = {id(pub): pub for pub in pdb.ref2pub.values()}.values()
+    return sorted(tuple(sorted(pub.titles)) for pub in pubs)
+
+
+@benchmark('lattice.dense_journal_pages')
+def dense_journal_pages(scale):
+    """PubDB.add_pub of records of one journal issue with dense page ranges,
+    checked to merge exactly as with hashed journal refs (before IntervalIndex)
+    """
+    records = synthetic.journal_issue_records(600 * scale, seed=2, last_page=100)
+    expected = _merged_titles(_journal_issue_pubdb(records, hashed=True))
+    def run():
+        pdb = _journal_issue_pubdb(records)
+        if _merged_titles(pdb) != expected:
+            raise AssertionError('IntervalIndex merges differ from hashed journal refs')
+    return run, len(records)
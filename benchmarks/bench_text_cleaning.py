@@ -0,0 +1,25 @@
+import random
+
+from benchmarks import benchmark
+from benchmarks import synthetic
+
+
+def _abstracts(scale):
+    rnd = random.Random(0)
+    return [synthetic.abstract(rnd) for i in range(100 * scale)]
+
+
+@benchmark('text_cleaning.lem')
+def lem(scale):
+    from text_cleaning import text_cleaning
+    abstracts = _abstracts(scale)
+    text_cleaning(abstracts[0]) # Loads NLTK models outside of the timings
+    return lambda: [text_cleaning(abstract) for abstract in abstracts], len(abstracts)
+
+
+@benchmark('text_cleaning.stem')
+def stem(scale):
+    from text_cleaning import text_cleaning
+    abstracts = _abstracts(scale)
+    text_cleaning(abstracts[0], 'stem')
+    return lambda: [text_cleaning(abstract, 'stem') for abstract in abstracts], len(abstracts)
@@ -0,0 +1,202 @@
+"""Local stand-ins for the `get` callable taken by the crawlers.
+
+ReplayGet serves recorded responses (eg. loaded from an HTTPCache pickle)
+without touching the network, recorded_searches() finds the author searches
+to replay. hal_response() and pubmed_responses() render
+synthetic records in the format of the HAL search API and of the NCBI
+E-utilities, so that the crawlers parsing can be benchmarked without a
+recorded cache.
+"""
+import gzip
+import json
+import pickle
+import re
+import zlib
+from urllib.parse import urlparse, parse_qs
+from xml.etree import ElementTree as ET
+
+
+class ReplayGet:
+    "Serve recorded bodies by URL; unknown URLs raise replay.MissingResponse"
+    def __init__(self, responses):
+        self.responses = responses
+        self.misses = 0
+
+    @classmethod
+    def from_http_cache(cls, file_name='http_cache.pk'):
+        with open(file_name, 'rb') as f:
+            cache = pickle.load(f)
+        return cls({url: gzip.decompress(data) for url, (data, date) in cache.items()})
+
+    def __call__(self, url, **kwargs):
+        from replay import MissingResponse
+        try:
+            return self.responses[url]
+        except KeyError:
+            self.misses += 1
+            raise MissingResponse(url) from None
+
+
+re_pubmed_term = re.compile(r'(?P<lname>[^,\[]+?)(?:, (?P<fname>[^\[]+)| (?P<initials>[^ \[]+))?\[F?AU\]')
+
+def recorded_searches(urls):
+    "(source, Author) of the HAL and PubMed author searches found among recorded URLs"
+    from bibdb import Author
+    searches = []
+    for url in sorted(urls):
+        parsed = urlparse(url)
+        params = parse_qs(parsed.query)
+        if parsed.netloc == 'api.archives-ouvertes.fr' and 'q' in params:
+            field, _, name = params['q'][0].partition(':')
+            if field == 'authFullName_t':
+                searches.append(('hal', Author(name)))
+        elif parsed.path.endswith('esearch.fcgi') and 'term' in params:
+            match = re_pubmed_term.match(params['term'][0])
+            if match:
+                searches.append(('pubmed', Author(*match.group('lname', 'fname', 'initials'))))
+    return searches
+
+
+class RoutedGet:
+    """Answer crawler queries from synthetic bodies routed by query
+    parameters: HAL searches by query, PubMed esearch by term and efetch by
+    PMID. A body stored under the None key answers any unknown query.
+    """
+    def __init__(self, hal=None, esearch=None, efetch=None):
+        self.hal = hal or {}
+        self.esearch = esearch or {}
+        self.efetch = efetch or {}
+
+    def __call__(self, url, **kwargs):
+        url = urlparse(url)
+        params = parse_qs(url.query)
+        if url.netloc == 'api.archives-ouvertes.fr':
+            return self._route(self.hal, params['q'][0])
+        elif url.path.endswith('esearch.fcgi'):
+            return self._route(self.esearch, params['term'][0])
+        elif url.path.endswith('efetch.fcgi'):
+            return self._route(self.efetch, params['id'][0])
+        raise KeyError(url.geturl())
+
+    @staticmethod
+    def _route(routes, key):
+        body = routes.get(key)
+        if body is None:
+            body = routes[None]
+        return body
+
+
+def _full_name(lname, fname, initials):
+    if fname is None:
+        fname = '. '.join(initials) + '.' if initials else ''
+    return ('%s %s' % (fname, lname)).strip()
+
+
+def _hal_doc(record):
+    doc = {
+        'authFullName_s': [_full_name(*name) for name in record['authors']],
+        'producedDate_tdate': record['date'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'docType_s': record['pubtype'],
+        'en_title_s': [record['title']],
+        'halId_s': 'hal-%08d' % (zlib.crc32(record['title'].encode('utf-8')) % 10**8),
+    }
+    if record['doi']:
+        doc['doiId_s'] = record['doi']
+    if record['abstract']:
+        doc['en_abstract_s'] = [record['abstract']]
+    if record['journal']:
+        doc.update({'journalTitle_s': record['journal'],
+                    'journalEissn_s': record['issn'],
+                    'volume_s': record['volume'],
+                    'issue_s': [record['issue']],
+                    'page_s': record['pages']})
+    return doc
+
+
+def hal_response(records):
+    "Body of a HAL search answering with `records`"
+    docs = [_hal_doc(record) for record in records]
+    return json.dumps({'response': {'numFound': len(docs), 'start': 0, 'docs': docs}}).encode('utf-8')
+
+
+def _sub(parent, tag, text=None, **attrib):
+    e = ET.SubElement(parent, tag, attrib)
+    if text is not None:
+        e.text = text
+    return e
+
+
+def pubmed_article(record, pmid, full=False):
+    """<PubmedArticle> element for a record, as found in efetch and baseline
+    files. `full` adds the elements of real records not read by the crawler
+    (affiliations, MeSH headings, references), which weigh on the parsing.
+    """
+    medart = ET.Element('PubmedArticle')
+    medcite = _sub(medart, 'MedlineCitation')
+    _sub(medcite, 'PMID', pmid)
+    created = _sub(medcite, 'DateCreated')
+    _sub(created, 'Year', str(record['date'].year))
+    _sub(created, 'Month', '%02d' % record['date'].month)
+    _sub(created, 'Day', '%02d' % record['date'].day)
+
+    article = _sub(medcite, 'Article')
+    journal = _sub(article, 'Journal')
+    if record['issn']:
+        _sub(journal, 'ISSN', record['issn'])
+    ji = _sub(journal, 'JournalIssue')
+    _sub(ji, 'Volume', record['volume'])
+    _sub(ji, 'Issue', record['issue'])
+    _sub(journal, 'Title', record['journal'] or 'Unknown journal')
+    _sub(article, 'ArticleTitle', record['title'])
+    if record['pages']:
+        _sub(_sub(article, 'Pagination'), 'MedlinePgn', record['pages'])
+    if record['abstract']:
+        _sub(_sub(article, 'Abstract'), 'AbstractText', record['abstract'])
+    authors = _sub(article, 'AuthorList')
+    for lname, fname, initials in record['authors']:
+        author = _sub(authors, 'Author')
+        _sub(author, 'LastName', lname)
+        if fname:
+            _sub(author, 'ForeName', fname)
+        if initials:
+            _sub(author, 'Initials', initials)
+        if full:
+            affiliation = 'Department of Biology, University of %s, France.' % lname
+            _sub(_sub(author, 'AffiliationInfo'), 'Affiliation', affiliation)
+    _sub(article, 'Language', 'eng')
+    pubtypes = _sub(article, 'PublicationTypeList')
+    _sub(pubtypes, 'PublicationType', 'Journal Article')
+
+    if full:
+        meshs = _sub(medcite, 'MeshHeadingList')
+        for word in record['title'].split()[:12]:
+            _sub(_sub(meshs, 'MeshHeading'), 'DescriptorName', word.title(), UI='D%06d' % len(word),
+                 MajorTopicYN='N')
+
+    pubmed_data = _sub(medart, 'PubmedData')
+    ids = _sub(pubmed_data, 'ArticleIdList')
+    _sub(ids, 'ArticleId', pmid, IdType='pubmed')
+    if record['doi']:
+        _sub(ids, 'ArticleId', record['doi'], IdType='doi')
+    if full:
+        references = _sub(pubmed_data, 'ReferenceList')
+        for i in range(30):
+            reference = _sub(references, 'Reference')
+            _sub(reference, 'Citation', '%s et al. %s. %s;%d:%d-%d.' % (
+                record['authors'][0][0], record['title'], record['journal'] or 'Unknown journal',
+                i + 1, 10 * i + 1, 10 * i + 9))
+            _sub(_sub(reference, 'ArticleIdList'), 'ArticleId', str(int(pmid) - i - 1), IdType='pubmed')
+    return medart
+
+
+def pubmed_responses(records, first_pmid=20000000, full=False):
+    """(esearch body, {pmid: efetch body}) answering with `records`"""
+    efetch = {}
+    for i, record in enumerate(records):
+        pmid = str(first_pmid + i)
+        root = ET.Element('PubmedArticleSet')
+        root.append(pubmed_article(record, pmid, full))
+        efetch[pmid] = ET.tostring(root, encoding='utf-8')
+    esearch = json.dumps({'esearchresult': {'count': str(len(efetch)),
+                                            'idlist': list(efetch)}}).encode('utf-8')
+    return esearch, efetch
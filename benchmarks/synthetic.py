@@ -0,0 +1,194 @@
+"""Reproducible synthetic corpora.
+
+Every generator takes an explicit `seed` so that two runs (or two commits)
+benchmark exactly the same data.
+"""
+from datetime import datetime
+import random
+
+from bibdb import Author, Ref, RefJournal, RefBook, Publication
+
+# Surnames are drawn with a Zipf-like law so that the common ones collide a
+# lot, as in a real author index.
+surnames = ['Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit',
+            'Durand', 'Leroy', 'Moreau', 'Simon', 'Laurent', 'Lefebvre', 'Michel',
+            'Garcia', 'David', 'Bertrand', 'Roux', 'Vincent', 'Fournier', 'Morel',
+            'Girard', 'André', 'Lefèvre', 'Mercier', 'Dupont', 'Lambert', 'Bonnet',
+            'François', 'Martinez', 'Smith', 'Johnson', 'Williams', 'Brown', 'Jones',
+            'Miller', 'Davis', 'Wilson', 'Anderson', 'Taylor', 'Wang', 'Li', 'Zhang',
+            'Liu', 'Chen', 'Yang', 'Huang', 'Zhao', 'Müller', 'Schmidt', 'Schneider',
+            'Fischer', 'Weber', 'Meyer', 'Wagner', 'Becker', 'Schulz', 'Hoffmann',
+            'Peterlongo', 'Lemaitre', 'Siegel', 'Dameron', 'Ainouche', 'Andonov']
+particles = ['De', 'Le', 'Van', 'Van Der', 'Von', 'Da', 'El']
+fnames = ['Jean', 'Marie', 'Pierre', 'Anne', 'Claire', 'Olivier', 'Thomas', 'Yann',
+          'Jean-Pierre', 'Marie-Claude', 'Hélène', 'Éric', 'Rémi', 'Zoé', 'Chloé',
+          'John', 'Mary', 'James', 'Patricia', 'Robert', 'Jennifer', 'Michael',
+          'Wei', 'Fang', 'Jing', 'Hans', 'Jürgen', 'Björn', 'Anne-Sophie', 'Lucas']
+
+journals = ['Bioinformatics', 'Nucleic Acids Research', 'PLoS ONE', 'BMC Genomics',
+            'Nature', 'Science', 'Journal of Theoretical Biology', 'Genome Research',
+            'Algorithms for Molecular Biology', 'Annals of Botany']
+
+# Small vocabulary with a skewed word distribution, enough to exercise
+# tokenization, stop words and the lemmatizer caches.
+words = ('the of and to in a is that for with as on by are this we from be an '
+         'genome sequence assembly read alignment graph algorithm protein gene '
+         'expression species plant evolution population model data analysis method '
+         'results show propose novel efficient memory time large scale structure '
+         'function network cell tissue regulation variant mutation phylogenetic '
+         'annotation database ontology semantic inference statistical learning '
+         'clustering classification hybrid polyploid duplication transcriptome '
+         'comparison performance accuracy coverage k-mer de bruijn index compressed '
+         'experiments using based approach new two three several high low').split()
+
+
+def _zipf_choice(rnd, population, s=1.1):
+    weights = [1 / (rank ** s) for rank in range(1, len(population) + 1)]
+    return lambda: rnd.choices(population, weights)[0]
+
+
+def author_tuples(n, seed=0):
+    "`n` (lname, fname, initials) tuples, as given by PubMed records"
+    rnd = random.Random(seed)
+    surname = _zipf_choice(rnd, surnames)
+    fname = _zipf_choice(rnd, fnames, s=0.8)
+    names = []
+    for i in range(n):
+        lname = surname()
+        if rnd.random() < 0.05:
+            lname = rnd.choice(particles) + ' ' + lname
+        first = fname()
+        if rnd.random() < 0.1:
+            first = first + ' ' + fname()
+        initials = ''.join(part[0] for part in first.replace('-', ' ').split())
+        kind = rnd.random()
+        if kind < 0.2:
+            names.append((lname, None, initials))
+        elif kind < 0.25:
+            names.append((lname, None, None))
+        else:
+            names.append((lname, first, initials))
+    return names
+
+
+def author_names(n, seed=0):
+    "`n` full name strings, as given by HAL records"
+    rnd = random.Random(seed)
+    names = []
+    for lname, fname, initials in author_tuples(n, seed):
+        if fname is None:
+            fname = '. '.join(initials) + '.' if initials else ''
+        elif rnd.random() < 0.2:
+            fname = fname.upper()
+        names.append(('%s %s' % (fname, lname)).strip())
+    return names
+
+
+def abstract(rnd, nwords=None):
+    if nwords is None:
+        nwords = rnd.randint(120, 300)
+    word = _zipf_choice(rnd, words, s=0.9)
+    sentences = []
+    while nwords > 0:
+        length = min(nwords, rnd.randint(8, 25))
+        sentence = ' '.join(word() for i in range(length))
+        sentences.append(sentence.capitalize() + '.')
+        nwords -= length
+    return ' '.join(sentences)
+
+
+def publication_records(n, seed=0, dup_rate=0.3, authors_per_pub=(1, 12)):
+    """`n` publication records (plain dicts), where about `dup_rate` of them
+    describe an already generated publication with a different subset of
+    identifiers and formatting, hitting the merge paths of PubDB.
+    """
+    rnd = random.Random(seed)
+    authors = author_tuples(max(8, n // 2), seed)
+    records = []
+    for i in range(n):
+        if records and rnd.random() < dup_rate:
+            base = rnd.choice(records)
+            record = dict(base)
+            # Drop some identifiers, keep at least one shared ref
+            for key in ('doi', 'pmid', 'journal'):
+                if rnd.random() < 0.4:
+                    record[key] = None
+            if not any(record[key] for key in ('doi', 'pmid', 'journal')):
+                record['doi'] = base['doi']
+            if rnd.random() < 0.3:
+                record['title'] = record['title'].upper() + '.'
+            if record['pages'] and rnd.random() < 0.3:
+                record['pages'] = record['pages'].split('-')[0]
+            if rnd.random() < 0.5:
+                record['abstract'] = None
+            records.append(record)
+            continue
+
+        journal = rnd.choice(journals)
+        pstart = rnd.randint(1, 2000)
+        title = ' '.join(rnd.choice(words) for i in range(rnd.randint(5, 15))).capitalize()
+        records.append({
+            'pubtype': rnd.choice(['ART', 'ART', 'ART', 'COMM', 'COUV', 'POSTER']),
+            'authors': rnd.sample(authors, rnd.randint(*authors_per_pub)),
+            'date': datetime(rnd.randint(1990, 2018), rnd.randint(1, 12), rnd.randint(1, 28)),
+            'doi': '10.%04d/synth.%d' % (rnd.randint(1000, 9999), i),
+            'pmid': str(10000000 + i) if rnd.random() < 0.6 else None,
+            'title': title,
+            'journal': journal,
+            'issn': '%04d-%04d' % (journals.index(journal), rnd.randint(0, 9999)),
+            'volume': str(rnd.randint(1, 40)),
+            'issue': str(rnd.randint(1, 12)),
+            'pages': '%d-%d' % (pstart, pstart + rnd.randint(0, 20)),
+            'book': title if rnd.random() < 0.05 else None,
+            'abstract': abstract(rnd) if rnd.random() < 0.8 else None,
+        })
+    return records
+
+
+def journal_issue_records(n, seed=0, last_page=1000):
+    """`n` records of a single journal issue with dense, overlapping page
+    ranges: the journal ref is often the only shared ref of two records.
+    """
+    rnd = random.Random(seed)
+    authors = author_tuples(max(8, n // 2), seed)
+    records = []
+    for i in range(n):
+        pstart = rnd.randint(1, last_page)
+        if rnd.random() < 0.2:
+            pages = str(pstart)
+        else:
+            pages = '%d-%d' % (pstart, pstart + rnd.randint(0, 12))
+        records.append({
+            'pubtype': 'ART',
+            'authors': rnd.sample(authors, rnd.randint(1, 6)),
+            'date': datetime(2010, 1, 1),
+            'doi': '10.%04d/issue.%d' % (rnd.randint(1000, 9999), i) if rnd.random() < 0.5 else None,
+            'pmid': None,
+            'title': ' '.join(rnd.choice(words) for i in range(rnd.randint(5, 15))).capitalize(),
+            'journal': journals[0],
+            'issn': '0000-0001' if rnd.random() < 0.7 else None,
+            'volume': '12',
+            'issue': '3',
+            'pages': pages,
+            'book': None,
+            'abstract': None,
+        })
+    return records
+
+
+def build_publication(record):
+    "Build a fresh Publication from a record of publication_records()"
+    refs = []
+    if record['doi']:
+        refs.append(Ref('doi', record['doi']))
+    if record['pmid']:
+        refs.append(Ref('pubmed', record['pmid']))
+    refs.append(Ref('en_title', record['title']))
+    if record['journal'] and record['pages']:
+        refs.append(RefJournal(record['journal'], record['issn'], record['issue'],
+                               record['volume'], record['pages']))
+    if record['book'] and record['pages']:
+        refs.append(RefBook(record['book'], None, record['pages']))
+    authors = [Author(*name) for name in record['authors']]
+    return Publication(record['pubtype'], authors, record['date'], refs,
+                       en_abstract=record['abstract'])
@@ -1,9 +1,12 @@
 from collections import defaultdict
 from functools import lru_cache
+import hashlib
 import re
+import time
 import unicodedata
 
 from lattice_containers import DeduplicatedKeysDict, DeduplicatedKeysDictOfSets, DeduplicatedSet
+from metrics import metrics
 
 import logging
 logger = logging.getLogger(__name__)
@@ -19,12 +22,22 @@ def clean_pii(pii):
         return None
 
 # Some text utilities :
-@lru_cache(maxsize=1024)
+class _AccentsTable(dict):
+    "str.translate() table stripping accents, filled on demand for each character"
+    def __missing__(self, code):
+        nfkd_form = unicodedata.normalize('NFKD', chr(code))
+        ascii_form = ''.join(c for c in nfkd_form if not unicodedata.combining(c))
+        self[code] = ascii_form
+        return ascii_form
+
+_accents_table = _AccentsTable()
+
 def remove_accents(input_str):
-    nfkd_form = unicodedata.normalize('NFKD', input_str)
-    ascii_form = ''.join(c for c in nfkd_form if not unicodedata.combining(c))
+    if input_str.isascii():
+        return input_str
+    ascii_form = input_str.translate(_accents_table)
     if ascii_form == input_str:
-        return input_str # Avoid string duplication in the cache
+        return input_str # Avoid string duplication
     else:
         return ascii_form
 
@@ -33,52 +46,77 @@ re_notalphanum = re.compile(r'([^\s\w]|_)+')
 uninformative_name_parts = {'Mr', 'Mme', 'Mrs'}
 lname_particles = {'De', 'Da', 'Le', 'El', 'Van', 'Del', 'Von', 'Zu', 'Of'}
 
-class Author:
-    def __init__(self, lname, fname=None, fname_initials=None):
-        lname = re_notalphanum.sub(' ', lname)
-        if fname is None and ' ' in lname:
-            # By default, last name is only the last word :
-            # Often the first name is in multple parts and lname in one part
-            fname, sep, lname = lname.rpartition(' ')
-
-        lname = remove_accents(lname).title()
-
-        if fname is not None:
-            fname = remove_accents(fname)
-
-            in_fname = True
-            fname_parts = []
-            lname_parts = []
-            initial_parts = []
-            # First name is split into parts, some are kept in last name
-            for name_part in fname.title().replace('-', ' ').split(' '):
-                if not name_part or name_part in uninformative_name_parts:
-                    continue
-
-                initial = name_part[0]
-                if len(name_part) == 1:
+def normalize_name(lname, fname=None, fname_initials=None):
+    """Canonical (lname, fname, fname_initials) fields of an Author.
+    When fname is None, lname may hold the full name.
+    """
+    lname = re_notalphanum.sub(' ', lname)
+    if fname is None and ' ' in lname:
+        # By default, last name is only the last word :
+        # Often the first name is in multple parts and lname in one part
+        fname, sep, lname = lname.rpartition(' ')
+
+    lname = remove_accents(lname).title()
+
+    if fname is not None:
+        fname = remove_accents(fname)
+
+        in_fname = True
+        fname_parts = []
+        lname_parts = []
+        initial_parts = []
+        # First name is split into parts, some are kept in last name
+        for name_part in fname.title().replace('-', ' ').split(' '):
+            if not name_part or name_part in uninformative_name_parts:
+                continue
+
+            initial = name_part[0]
+            if len(name_part) == 1:
+                initial_parts.append(initial)
+            else:
+                if name_part in lname_particles:
+                    in_fname = False
+
+                if in_fname:
                     initial_parts.append(initial)
+                    fname_parts.append(name_part)
                 else:
-                    if name_part in lname_particles:
-                        in_fname = False
+                    lname_parts.append(name_part)
 
-                    if in_fname:
-                        initial_parts.append(initial)
-                        fname_parts.append(name_part)
-                    else:
-                        lname_parts.append(name_part)
+        fname = ' '.join(fname_parts) if fname_parts else None
+        if fname_initials is None:
+            fname_initials = ''.join(initial_parts)
 
-            fname = ' '.join(fname_parts) if fname_parts else None
-            if fname_initials is None:
-                fname_initials = ''.join(initial_parts)
+        if lname_parts: # Recovered last name parts from fname
+            lname_parts.append(lname)
+            lname = ' '.join(lname_parts)
 
-            if lname_parts: # Recovered last name parts from fname
-                lname_parts.append(lname)
-                lname = ' '.join(lname_parts)
+    return lname, fname, fname_initials
 
-        self.lname = lname
-        self.fname = fname
-        self.fname_initials = fname_initials
+# Records list the same authors over and over: normalization is cached on
+# the raw fields, Authors being mutable only the normalized fields are shared.
+cached_normalize_name = lru_cache(maxsize=65536)(normalize_name)
+
+class Author:
+    def __init__(self, lname, fname=None, fname_initials=None):
+        self.lname, self.fname, self.fname_initials = cached_normalize_name(lname, fname, fname_initials)
+
+    @classmethod
+    def from_many(cls, names):
+        """Build a list of Authors from full names or from
+        (lname, fname, fname_initials) tuples.
+        """
+        new = cls.__new__
+        authors = []
+        for name in names:
+            if type(name) is str:
+                fields = cached_normalize_name(name, None, None)
+            else:
+                fields = cached_normalize_name(*name)
+            author = new(cls)
+            author.lname, author.fname, author.fname_initials = fields
+            authors.append(author)
+        return authors
 
     def __str__(self):
         if self.fname:
@@ -111,7 +149,10 @@ class Author:
         if not (neq_fname or neq_fname_initials):
             return self
 
-        logger.info('Mergin authors %r <- %r', self, other)
+        if metrics.enabled:
+            metrics.incr('author.merge')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Merging authors %r <- %r', self, other)
 
         if neq_fname:
             if self.fname is None:
@@ -151,6 +192,10 @@ class Ref:
         if self is other: return True
         return self.reftype == other.reftype and self.ref == other.ref
 
+    def block_key(self):
+        "Equal refs have equal block keys"
+        return (self.reftype, self.ref)
+
 class PaginatedRef(Ref):
     "For Journals and Books"
     def __init__(self, title, pstart, pend=None):
@@ -162,6 +207,13 @@ class PaginatedRef(Ref):
         self.pstart = pstart
         self.pend = pend
 
+    # Indexed by DeduplicatedSet in an IntervalIndex, see __eq__
+    def interval_block(self):
+        return self.block_key()
+
+    def interval(self):
+        return self.pstart, self.pend
+
     def includedin(self, other):
         if any([type(p) is not int
                 for p in [self.pstart, other.pstart, self.pend, other.pend]]):
@@ -296,9 +348,25 @@ class RefJournal(PaginatedRef):
             self.issn = other.issn
         return self
 
+    def block_key(self):
+        # Equality requires the same issue and volume
+        return (self.reftype, self.ref, self.issue, self.volume)
+
     _asstr = lambda self: '%s issn:%s issue:%s volume:%s' % (PaginatedRef._asstr(self), self.issn, self.issue, self.volume)
 
 
+def abstract_digest(abstract):
+    """Key of the en_abstract and fr_abstract refs of a normalized abstract:
+    ref2pub does not keep the texts, PubDB.add_pub checks for collisions
+    """
+    return hashlib.sha1(abstract.encode('utf-8')).digest()
+
+def abstract_collision(ref, pub, existing_pub):
+    "Whether an abstract ref of `pub` matched `existing_pub` having another abstract with the same digest"
+    existing = getattr(existing_pub, ref.reftype)
+    return (existing is not None and existing is not getattr(pub, ref.reftype)
+            and existing != getattr(pub, ref.reftype) and abstract_digest(existing) == ref.ref)
+
 prio_pubtype = {'ART': 100, 'COUV': 76, 'DOUV': 77, 'OUV': 75, 'THESE': 75, 'HDR':75, 'MEM': 75, 'COMM': 50, 'REPORT': 25, 'PATENT': 15, 'MINUTES': 15, 'SYNTHESE': 13, 'LECTURE': 12, 'NOTE': 11, 'POSTER': 10, 'OTHERREPORT':7, 'SON': 7, 'MAP': 7, 'OTHERREPORT': 6, 'PRESCONF': 6, 'OTHER': 5, 'IMG': 4, 'VIDEO': 4, 'UNDEFINED': 0, None: 0}
 
 class Publication:
@@ -306,12 +374,14 @@ class Publication:
         self.pubtype = pubtype.upper()
         self.date = date
         self.authors = authors
+        self._init_refs(refs, en_abstract, fr_abstract)
 
+    def _init_refs(self, refs, en_abstract, fr_abstract):
         if en_abstract and len(en_abstract) >= 100:
             # Normalization over split characters :
-            en_abstract = ' '.join(x for x in en_abstract.split() if x)
+            en_abstract = ' '.join(en_abstract.split())
             self.en_abstract = en_abstract
-            en_abstract_ref = Ref('en_abstract', en_abstract)
+            en_abstract_ref = Ref('en_abstract', abstract_digest(en_abstract))
             if type(refs) is list:
                 refs.append(en_abstract_ref)
             else:
@@ -321,9 +391,9 @@ class Publication:
 
         if fr_abstract and len(fr_abstract) >= 100:
             # Normalization over split characters :
-            fr_abstract = ' '.join(x for x in fr_abstract.split() if x)
+            fr_abstract = ' '.join(fr_abstract.split())
             self.fr_abstract = fr_abstract
-            fr_abstract_ref = Ref('fr_abstract', fr_abstract)
+            fr_abstract_ref = Ref('fr_abstract', abstract_digest(fr_abstract))
             if type(refs) is list:
                 refs.append(fr_abstract_ref)
             else:
@@ -331,7 +401,6 @@ class Publication:
         else:
             self.fr_abstract = None
 
-
         self.refs = refs
         self.titles = {ref.ref for ref in self.refs if ref.reftype.endswith('_title')}
 
@@ -360,7 +429,10 @@ class Publication:
             return False
 
     def __ior__(self, other):
-        logger.info('Merging %r <- %r', self, other)
+        if metrics.enabled:
+            metrics.incr('publication.merge')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Merging %r <- %r', self, other)
 
         assert isinstance(self.refs, DeduplicatedSet)
         self.refs |= other.refs
@@ -376,14 +448,20 @@ class Publication:
             self.en_abstract = other.en_abstract
         elif other.en_abstract is not None:
             if self.en_abstract != other.en_abstract:
-                logger.info('Different abastracts for %r', self)
+                if metrics.enabled:
+                    metrics.incr('publication.merge.abstract_conflict')
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('Different abastracts for %r', self)
                 self.en_abstract = max(self.en_abstract, other.en_abstract, key=len)
 
         if self.fr_abstract is None:
             self.fr_abstract = other.fr_abstract
         elif other.fr_abstract is not None:
             if self.fr_abstract != other.fr_abstract:
-                logger.info('Different french abastracts for %r', self)
+                if metrics.enabled:
+                    metrics.incr('publication.merge.abstract_conflict')
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug('Different french abastracts for %r', self)
                 self.fr_abstract = max(self.fr_abstract, other.fr_abstract, key=len)
         return self
 
@@ -394,15 +472,61 @@ class Publication:
         Publication not deduplicated by PubDB should not be placed in a hash index.
     """
 
+class LazyPublication(Publication):
+    """A Publication keeping its raw record until its fields are accessed.
+
+    `load_refs(record)` returns the (refs, en_abstract, fr_abstract)
+    arguments of Publication, computed on the first access to refs, titles
+    or abstracts, and `load_date(record)` returns the date. Records filtered
+    out on their authors are thus discarded without paying for the parsing
+    of identifiers, the normalization of abstracts and the date parsing.
+    The date is also computed with the refs, so that the publications stored
+    by a PubDB (which reads their refs) do not keep their raw record.
+    """
+    _refs_fields = frozenset(['refs', 'titles', 'en_abstract', 'fr_abstract'])
+
+    def __init__(self, pubtype, authors, record, load_refs, load_date):
+        self.pubtype = pubtype.upper()
+        self.authors = authors
+        self._record = record
+        self._load_refs = load_refs
+        self._load_date = load_date
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, ie. fields not yet materialized
+        d = self.__dict__
+        if name == 'date' and '_load_date' in d:
+            self.date = d.pop('_load_date')(d['_record'])
+        elif name in LazyPublication._refs_fields and '_load_refs' in d:
+            self._init_refs(*d.pop('_load_refs')(d['_record']))
+            if '_load_date' in d:
+                self.date = d.pop('_load_date')(d['_record'])
+        else:
+            raise AttributeError(name)
+
+        if '_load_date' not in d and '_load_refs' not in d:
+            del self._record
+        return d[name]
+
+    def materialize(self):
+        "Compute all the deferred fields, releasing the raw record"
+        self.date
+        self.refs
+        return self
+
+
 class PubDB:
     def __init__(self):
         self.ref2pub = DeduplicatedKeysDict()
         self.author_pubs = DeduplicatedKeysDictOfSets()
 
     def lookup_byrefs(self, refs):
-        results = {}
         for ref in refs:
             pub = self.ref2pub.get(ref)
+            if metrics.enabled:
+                metrics.incr('pubdb.ref_lookup')
+                if pub is not None:
+                    metrics.incr('pubdb.ref_lookup.hit')
             if pub is not None:
                 yield ref, pub
 
@@ -427,8 +551,27 @@ class PubDB:
                 return publications[0]
 
     def add_pub(self, pub):
+        "Add or merge a publication, returning the Publication stored in the database"
+        if metrics.enabled:
+            t0 = time.perf_counter()
+
+        # Names as in the record: merges alter the author_pubs keys (see disambiguation)
+        mentions = dict.fromkeys((author.lname, author.fname, author.fname_initials)
+                                 for author in pub.authors)
+
         ref2existing_pubs = defaultdict(set) # Count the number of shared refs
         existing_pub = None
+        # Abstract refs whose digest is taken by another abstract are not indexed
+        collisions = []
+        for ref in pub.refs:
+            if ref.reftype in ('en_abstract', 'fr_abstract'):
+                existing_pub_candidate = self.ref2pub.get(ref)
+                if existing_pub_candidate is not None and abstract_collision(ref, pub, existing_pub_candidate):
+                    logger.warning('Abstract digest collision between %r and %r', pub, existing_pub_candidate)
+                    collisions.append(ref)
+        if collisions:
+            pub.refs = [ref for ref in pub.refs if ref not in collisions]
+
         for ref, existing_pub_candidate in self.lookup_byrefs(pub.refs):
             if not isinstance(ref, PaginatedRef) or type(ref.pstart) is int:
                 ref2existing_pubs[existing_pub_candidate].add(ref)
@@ -439,14 +582,58 @@ class PubDB:
         if existing_pub is None and ref2existing_pubs:
             # Publication with the highest number of matching refs :
             existing_pub, refs = max(ref2existing_pubs.items(), key=lambda x: len(x[1]))
-            logger.warning('Merging\t   %r\n\t<- %r\n\ton behalf of: %r', existing_pub, pub, refs)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info('Merging\t   %r\n\t<- %r\n\ton behalf of: %r', existing_pub, pub, refs)
+            if metrics.enabled:
+                metrics.incr('pubdb.merge.fuzzy')
+
+        if metrics.enabled:
+            metrics.incr('pubdb.add_pub')
+            metrics.observe('pubdb.add_pub.candidates', len(ref2existing_pubs))
+            if existing_pub is not None:
+                metrics.incr('pubdb.merge')
+                for ref in ref2existing_pubs.get(existing_pub, ()):
+                    metrics.incr('pubdb.merge.by_reftype.%s' % ref.reftype)
+            else:
+                metrics.incr('pubdb.insert')
 
         if existing_pub is not None:
             existing_pub |= pub # merge information from pub with the publication already presentin the db
             # update our indexes:
             self.ref2pub.update({ref: existing_pub for ref in existing_pub.refs})
             self.author_pubs.update({author: existing_pub for author in existing_pub.authors})
+            existing_pub.author_mentions.update(mentions)
         else:
             # Both sets in the new Publication now share objects from our PubDB indexes:
             pub.refs = DeduplicatedSet(self.ref2pub.update({ref: pub for ref in pub.refs}))
             pub.authors = DeduplicatedSet(self.author_pubs.update({author: pub for author in pub.authors}))
+            pub.author_mentions = mentions
+
+        if metrics.enabled:
+            metrics.observe('pubdb.add_pub.seconds', time.perf_counter() - t0)
+
+        return pub if existing_pub is None else existing_pub
+
+    def add_pubs(self, pubs):
+        "add_pub() each publication, in order (see ingest for parsing them in worker processes)"
+        for pub in pubs:
+            self.add_pub(pub)
+
+    def record_metrics(self):
+        "Observe the sizes of the indexes and of their hash buckets"
+        metrics.observe('pubdb.ref2pub.size', len(self.ref2pub))
+        metrics.observe('pubdb.author_pubs.size', len(self.author_pubs))
+        for size in self.ref2pub.bucket_sizes():
+            metrics.observe('pubdb.ref2pub.bucket_size', size)
+        for size in self.author_pubs.bucket_sizes():
+            metrics.observe('pubdb.author_pubs.bucket_size', size)
+
+    def freeze(self):
+        "Read-only columnar copy of the database (requires NumPy), see columnar.FrozenPubDB"
+        from columnar import FrozenPubDB
+        return FrozenPubDB.from_pubdb(self)
+
+    def export(self, dirname, chunk_size=1 << 16):
+        "Stream the database to columnar files and edge lists, see columnar.export_pubdb"
+        from columnar import export_pubdb
+        export_pubdb(self, dirname, chunk_size)
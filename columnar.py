@@ -0,0 +1,529 @@
+"""Read-only columnar form of a PubDB, for analytics.
+
+Publications, authors and refs are numbered in the order of insertion in
+the PubDB. Per publication fields are NumPy arrays, the author and ref
+lists of publications are stored as CSR style offsets (`*_indptr`) into
+id arrays, and strings are stored in StringTables (an UTF-8 buffer plus
+offsets).
+
+On disk, a frozen database is a directory holding a `manifest.json` and one
+raw little-endian `.bin` file per array, which load() maps in memory:
+loading is instantaneous and only the pages actually read are loaded.
+export_pubdb() writes the same files directly from a PubDB, chunk by chunk,
+plus author-publication and co-authorship edge lists (see load_array()).
+"""
+from datetime import date, datetime
+import json
+import os
+
+import numpy as np
+
+__all__ = ['StringTable', 'FrozenPubDB', 'export_pubdb', 'load_array']
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+
+class StringTable:
+    "Immutable sequence of strings stored in a single UTF-8 buffer"
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings):
+        "None is stored as an empty string"
+        encoded = [s.encode('utf-8') if s else b'' for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        np.cumsum([len(s) for s in encoded], out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype='u1')
+        return cls(offsets, data)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def lengths(self):
+        "Length in bytes of every string, vectorized"
+        return np.diff(self.offsets)
+
+
+def _ref_value(ref):
+    if hasattr(ref, 'pstart'): # PaginatedRef and subclasses
+        return ref._asstr()
+    elif ref.reftype.endswith('_abstract'): # Abstracts are in their own tables
+        return ref.ref.hex()
+    else:
+        return str(ref.ref)
+
+
+def _publications(pdb):
+    "Distinct publications of `pdb`: those of ref2pub, then those only in author_pubs (without refs)"
+    seen = set()
+    for pubs in ([pub] for pub in pdb.ref2pub.values()), pdb.author_pubs.values():
+        for some_pubs in pubs:
+            for pub in some_pubs:
+                if id(pub) not in seen:
+                    seen.add(id(pub))
+                    yield pub
+
+
+def _author_keys(pdb):
+    """Function giving the authors of a publication as author_pubs keys.
+    Merged publications may keep Author objects equal to, but distinct
+    from, the author_pubs keys. Authors are matched to the keys having the
+    publication, in the order of Publication.authors.
+    """
+    pub_keys = {}
+    for author, pubs in pdb.author_pubs.items():
+        for pub in pubs:
+            pub_keys.setdefault(id(pub), []).append(author)
+
+    def pub_authors(pub):
+        keys = pub_keys.get(id(pub), [])
+        authors = []
+        for author in pub.authors:
+            match = None
+            for key in keys:
+                if key is author:
+                    match = key
+                    break
+                elif match is None and key == author:
+                    match = key
+            if match is None:
+                match = author
+            if all(match is not a for a in authors):
+                authors.append(match)
+        authors.extend(key for key in keys if all(key is not a for a in authors))
+        return authors
+    return pub_authors
+
+
+class _Numbering:
+    """Numbering of the publications, authors and refs of a PubDB, shared by
+    FrozenPubDB.from_pubdb() and export_pubdb(). Refs are numbered in the
+    order of ref2pub, publications in the order of _publications(), authors
+    in the order of author_pubs then as they appear in rows(), calling
+    add_author(author) for each new author.
+    """
+    def __init__(self, pdb, add_author):
+        self.pubs = list(_publications(pdb))
+        self.pubtypes = sorted({pub.pubtype for pub in self.pubs})
+        self.pubtype_codes = {pubtype: i for i, pubtype in enumerate(self.pubtypes)}
+        self.refs = list(pdb.ref2pub)
+        self.reftypes = sorted({ref.reftype for ref in self.refs})
+        self.reftype_codes = {reftype: i for i, reftype in enumerate(self.reftypes)}
+        self._ref_ids = {id(ref): i for i, ref in enumerate(self.refs)}
+        self._author_ids = {}
+        self._add_author = add_author
+        for author in pdb.author_pubs:
+            self._author_id(author)
+        self._author_keys = _author_keys(pdb)
+
+    def _author_id(self, author):
+        i = self._author_ids.get(id(author))
+        if i is None:
+            i = self._author_ids[id(author)] = len(self._author_ids)
+            self._add_author(author)
+        return i
+
+    def rows(self):
+        "(publication, author ids, ref ids) of each publication, in order"
+        ref_ids = self._ref_ids
+        for pub in self.pubs:
+            yield (pub, [self._author_id(author) for author in self._author_keys(pub)],
+                   [ref_ids[id(ref)] for ref in pub.refs if id(ref) in ref_ids])
+
+
+def _day(d):
+    if isinstance(d, datetime):
+        d = d.date()
+    if isinstance(d, date):
+        return np.datetime64(d, 'D')
+    return np.datetime64('NaT', 'D')
+
+
+def _readonly(array):
+    array.flags.writeable = False
+    return array
+
+
+def _read(dirname, manifest, name, mmap):
+    desc = manifest['arrays'][name]
+    path = os.path.join(dirname, name + '.bin')
+    if desc['length'] == 0: # Empty files can't be mapped
+        return np.zeros(0, dtype=desc['dtype'])
+    elif mmap:
+        return np.memmap(path, dtype=desc['dtype'], mode='r', shape=(desc['length'],))
+    else:
+        return _readonly(np.fromfile(path, dtype=desc['dtype']))
+
+
+def _read_manifest(dirname):
+    with open(os.path.join(dirname, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest['version'] != FORMAT_VERSION:
+        raise ValueError('Unsupported frozen PubDB version %r' % manifest['version'])
+    return manifest
+
+
+def load_array(dirname, name, mmap=True):
+    """Any array of a frozen database directory, eg. the edge lists written
+    by export_pubdb(): edge_pub/edge_author and coauthor_a/coauthor_b/coauthor_weight.
+    """
+    return _read(dirname, _read_manifest(dirname), name, mmap)
+
+
+class FrozenPubDB:
+    """Immutable columnar database, built by PubDB.freeze() or load().
+
+    Publication columns: pubtype (codes into `pubtypes`), date
+    (datetime64[D], NaT when unknown), has_en_abstract, has_fr_abstract,
+    author_indptr/author_ids, ref_indptr/ref_ids.
+    Author columns: author_lname, author_fname, author_initials.
+    Ref columns: reftype (codes into `reftypes`) and ref_value.
+    String tables: title, en_abstract, fr_abstract (per publication) and
+    the author_* and ref_value tables.
+    """
+    arrays = ['pubtype', 'date', 'has_en_abstract', 'has_fr_abstract',
+              'author_indptr', 'author_ids', 'ref_indptr', 'ref_ids', 'reftype']
+    strings = ['title', 'en_abstract', 'fr_abstract',
+               'author_lname', 'author_fname', 'author_initials', 'ref_value']
+
+    def __init__(self, columns, pubtypes, reftypes):
+        for name in self.arrays + self.strings:
+            setattr(self, name, columns[name])
+        self.pubtypes = list(pubtypes)
+        self.reftypes = list(reftypes)
+        self._author_index = None
+
+    @classmethod
+    def from_pubdb(cls, pdb):
+        authors = []
+        numbering = _Numbering(pdb, authors.append)
+        pub_authors = []
+        pub_refs = []
+        for pub, author_ids, ref_ids in numbering.rows():
+            pub_authors.append(author_ids)
+            pub_refs.append(ref_ids)
+        pubs = numbering.pubs
+        refs = numbering.refs
+
+        def csr(lists):
+            indptr = np.zeros(len(lists) + 1, dtype='<i8')
+            np.cumsum([len(l) for l in lists], out=indptr[1:])
+            ids = np.fromiter((i for l in lists for i in l), dtype='<i4', count=indptr[-1])
+            return indptr, ids
+
+        columns = {}
+        columns['pubtype'] = np.array([numbering.pubtype_codes[pub.pubtype] for pub in pubs], dtype='u1')
+        columns['date'] = np.array([_day(pub.date) for pub in pubs], dtype='datetime64[D]')
+        columns['has_en_abstract'] = np.array([pub.en_abstract is not None for pub in pubs], dtype=bool)
+        columns['has_fr_abstract'] = np.array([pub.fr_abstract is not None for pub in pubs], dtype=bool)
+        columns['author_indptr'], columns['author_ids'] = csr(pub_authors)
+        columns['ref_indptr'], columns['ref_ids'] = csr(pub_refs)
+        columns['reftype'] = np.array([numbering.reftype_codes[ref.reftype] for ref in refs], dtype='u1')
+
+        columns['title'] = StringTable.from_strings(pub.title for pub in pubs)
+        columns['en_abstract'] = StringTable.from_strings(pub.en_abstract for pub in pubs)
+        columns['fr_abstract'] = StringTable.from_strings(pub.fr_abstract for pub in pubs)
+        columns['author_lname'] = StringTable.from_strings(author.lname for author in authors)
+        columns['author_fname'] = StringTable.from_strings(author.fname for author in authors)
+        columns['author_initials'] = StringTable.from_strings(author.fname_initials for author in authors)
+        columns['ref_value'] = StringTable.from_strings(_ref_value(ref) for ref in refs)
+
+        for name, column in columns.items():
+            if isinstance(column, StringTable):
+                _readonly(column.offsets)
+                _readonly(column.data)
+            else:
+                _readonly(column)
+        return cls(columns, numbering.pubtypes, numbering.reftypes)
+
+    def __len__(self):
+        return len(self.pubtype)
+
+    @property
+    def nauthors(self):
+        return len(self.author_lname)
+
+    def author_name(self, i):
+        "Same as str() of the Author"
+        fname = self.author_fname[i]
+        lname = self.author_lname[i]
+        if fname:
+            return '%s %s' % (fname, lname)
+        initials = self.author_initials[i]
+        if initials:
+            return '%s. %s' % (initials, lname)
+        return lname
+
+    def author_ids_of(self, author):
+        "Ids of the authors named as an Author (or its str())"
+        if self._author_index is None:
+            self._author_index = {}
+            for i in range(self.nauthors):
+                self._author_index.setdefault(self.author_name(i), []).append(i)
+        return self._author_index.get(str(author), [])
+
+    def author_id(self, author):
+        "First id of an Author (or of its str()), None if unknown"
+        ids = self.author_ids_of(author)
+        return ids[0] if ids else None
+
+    # Vectorized filters, returning boolean masks over the publications
+
+    def by_years(self, start=None, end=None):
+        "Publications dated from year `start` to year `end` (inclusive)"
+        years = self.date.astype('datetime64[Y]')
+        mask = ~np.isnat(years)
+        if start is not None:
+            mask &= years >= np.datetime64(str(start), 'Y')
+        if end is not None:
+            mask &= years <= np.datetime64(str(end), 'Y')
+        return mask
+
+    def by_pubtypes(self, pubtypes):
+        codes = [self.pubtypes.index(pubtype) for pubtype in pubtypes if pubtype in self.pubtypes]
+        return np.isin(self.pubtype, codes)
+
+    def by_authors(self, authors):
+        "Publications having at least one of `authors` (ids, Authors or names)"
+        ids = []
+        for author in authors:
+            if isinstance(author, (int, np.integer)):
+                ids.append(author)
+            else:
+                ids.extend(self.author_ids_of(author))
+        entries = np.isin(self.author_ids, ids)
+        entry_pub = np.repeat(np.arange(len(self)), np.diff(self.author_indptr))
+        mask = np.zeros(len(self), dtype=bool)
+        mask[entry_pub[entries]] = True
+        return mask
+
+    def by_abstract(self, language=None):
+        "Publications with an abstract, in english or french if `language` is 'en' or 'fr'"
+        if language == 'en':
+            return self.has_en_abstract.copy()
+        elif language == 'fr':
+            return self.has_fr_abstract.copy()
+        elif language is None:
+            return self.has_en_abstract | self.has_fr_abstract
+        raise ValueError('Unknown abstract language %r' % language)
+
+    def select(self, years=None, pubtypes=None, authors=None, has_abstract=None):
+        """Indices of the publications matching all the given filters.
+        years is a (start, end) tuple and has_abstract a boolean or a language.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if years is not None:
+            mask &= self.by_years(*years)
+        if pubtypes is not None:
+            mask &= self.by_pubtypes(pubtypes)
+        if authors is not None:
+            mask &= self.by_authors(authors)
+        if has_abstract is not None:
+            if has_abstract in ('en', 'fr'):
+                mask &= self.by_abstract(has_abstract)
+            elif has_abstract:
+                mask &= self.by_abstract()
+            else:
+                mask &= ~self.by_abstract()
+        return np.flatnonzero(mask)
+
+    def pub_authors(self, i):
+        return self.author_ids[self.author_indptr[i]:self.author_indptr[i + 1]]
+
+    def pub_refs(self, i):
+        return self.ref_ids[self.ref_indptr[i]:self.ref_indptr[i + 1]]
+
+    def author_pub_matrix(self):
+        "Boolean scipy.sparse CSC matrix of shape (authors, publications)"
+        from scipy import sparse
+        data = np.ones(len(self.author_ids), dtype=bool)
+        return sparse.csc_matrix((data, self.author_ids, self.author_indptr),
+                                 shape=(self.nauthors, len(self)))
+
+    # Storage
+
+    def save(self, dirname):
+        os.makedirs(dirname, exist_ok=True)
+        manifest = {'version': FORMAT_VERSION, 'arrays': {},
+                    'pubtypes': self.pubtypes, 'reftypes': self.reftypes}
+
+        def write(name, array):
+            if array.dtype.kind == 'M':
+                array = array.astype('<i8')
+            array = np.ascontiguousarray(array)
+            if array.dtype.byteorder == '>':
+                array = array.byteswap().view(array.dtype.newbyteorder('<'))
+            array.tofile(os.path.join(dirname, name + '.bin'))
+            manifest['arrays'][name] = {'dtype': array.dtype.str, 'length': len(array)}
+
+        for name in self.arrays:
+            write(name, getattr(self, name))
+        for name in self.strings:
+            table = getattr(self, name)
+            write(name + '.offsets', table.offsets)
+            write(name + '.data', table.data)
+
+        with open(os.path.join(dirname, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=1)
+
+    @classmethod
+    def load(cls, dirname, mmap=True):
+        manifest = _read_manifest(dirname)
+        columns = {name: _read(dirname, manifest, name, mmap) for name in cls.arrays}
+        columns['date'] = columns['date'].view('datetime64[D]')
+        for name in cls.strings:
+            columns[name] = StringTable(_read(dirname, manifest, name + '.offsets', mmap),
+                                        _read(dirname, manifest, name + '.data', mmap))
+        return cls(columns, manifest['pubtypes'], manifest['reftypes'])
+
+
+class _ColumnWriter:
+    "Appends values to a `.bin` file, converting them by chunks"
+    def __init__(self, dirname, name, dtype, chunk_size):
+        self.name = name
+        self.dtype = np.dtype(dtype)
+        self.file = open(os.path.join(dirname, name + '.bin'), 'wb')
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.length = 0
+
+    def append(self, value):
+        self.chunk.append(value)
+        if len(self.chunk) >= self.chunk_size:
+            self.flush()
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def flush(self):
+        np.array(self.chunk, dtype=self.dtype).tofile(self.file)
+        self.length += len(self.chunk)
+        self.chunk = []
+
+    def close(self, manifest):
+        self.flush()
+        self.file.close()
+        manifest['arrays'][self.name] = {'dtype': self.dtype.str, 'length': self.length}
+
+
+class _StringsWriter:
+    "Appends strings to the `.offsets` and `.data` files of a StringTable"
+    def __init__(self, dirname, name, chunk_size):
+        self.offsets = _ColumnWriter(dirname, name + '.offsets', '<i8', chunk_size)
+        self.data = open(os.path.join(dirname, name + '.data.bin'), 'wb')
+        self.name = name
+        self.offset = 0
+        self.offsets.append(0)
+
+    def append(self, string):
+        if string:
+            encoded = string.encode('utf-8')
+            self.data.write(encoded)
+            self.offset += len(encoded)
+        self.offsets.append(self.offset)
+
+    def close(self, manifest):
+        self.offsets.close(manifest)
+        self.data.close()
+        manifest['arrays'][self.name + '.data'] = {'dtype': '|u1', 'length': self.offset}
+
+
+def export_pubdb(pdb, dirname, chunk_size=1 << 16):
+    """Write `pdb` to `dirname` in the format of FrozenPubDB.save(), without
+    building the arrays in memory, plus edge lists:
+    - edge_pub, edge_author: the (publication, author) pairs, by publication
+    - coauthor_a, coauthor_b, coauthor_weight: pairs of authors (a < b) having
+      written `weight` publications together, sorted. Their counts are the
+      only data held in memory until the end.
+    """
+    os.makedirs(dirname, exist_ok=True)
+    columns = {}
+    def column(name, dtype):
+        columns[name] = _ColumnWriter(dirname, name, dtype, chunk_size)
+        return columns[name]
+    def strings(name):
+        columns[name] = _StringsWriter(dirname, name, chunk_size)
+        return columns[name]
+
+    author_lname = strings('author_lname')
+    author_fname = strings('author_fname')
+    author_initials = strings('author_initials')
+    def add_author(author):
+        author_lname.append(author.lname)
+        author_fname.append(author.fname)
+        author_initials.append(author.fname_initials)
+    numbering = _Numbering(pdb, add_author)
+
+    reftype = column('reftype', 'u1')
+    ref_value = strings('ref_value')
+    for ref in numbering.refs:
+        reftype.append(numbering.reftype_codes[ref.reftype])
+        ref_value.append(_ref_value(ref))
+
+    pubtype = column('pubtype', 'u1')
+    dates = column('date', '<i8')
+    has_en_abstract = column('has_en_abstract', bool)
+    has_fr_abstract = column('has_fr_abstract', bool)
+    title = strings('title')
+    en_abstract = strings('en_abstract')
+    fr_abstract = strings('fr_abstract')
+    author_indptr = column('author_indptr', '<i8')
+    pub_author_ids = column('author_ids', '<i4')
+    ref_indptr = column('ref_indptr', '<i8')
+    pub_ref_ids = column('ref_ids', '<i4')
+    edge_pub = column('edge_pub', '<i4')
+    edge_author = column('edge_author', '<i4')
+    author_indptr.append(0)
+    ref_indptr.append(0)
+    nauthors = nrefs = 0
+    coauthors = {}
+
+    for i, (pub, authors, refs) in enumerate(numbering.rows()):
+        pubtype.append(numbering.pubtype_codes[pub.pubtype])
+        dates.append(_day(pub.date).astype('<i8'))
+        has_en_abstract.append(pub.en_abstract is not None)
+        has_fr_abstract.append(pub.fr_abstract is not None)
+        title.append(pub.title)
+        en_abstract.append(pub.en_abstract)
+        fr_abstract.append(pub.fr_abstract)
+
+        pub_author_ids.extend(authors)
+        nauthors += len(authors)
+        author_indptr.append(nauthors)
+        for a in authors:
+            edge_pub.append(i)
+            edge_author.append(a)
+        authors = sorted(set(authors))
+        for j, a in enumerate(authors):
+            for b in authors[j + 1:]:
+                coauthors[a, b] = coauthors.get((a, b), 0) + 1
+
+        pub_ref_ids.extend(refs)
+        nrefs += len(refs)
+        ref_indptr.append(nrefs)
+
+    coauthor_a = column('coauthor_a', '<i4')
+    coauthor_b = column('coauthor_b', '<i4')
+    coauthor_weight = column('coauthor_weight', '<i4')
+    for (a, b), weight in sorted(coauthors.items()):
+        coauthor_a.append(a)
+        coauthor_b.append(b)
+        coauthor_weight.append(weight)
+
+    manifest = {'version': FORMAT_VERSION, 'arrays': {},
+                'pubtypes': numbering.pubtypes, 'reftypes': numbering.reftypes}
+    for writer in columns.values():
+        writer.close(manifest)
+    with open(os.path.join(dirname, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1)
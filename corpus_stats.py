@@ -0,0 +1,130 @@
+"""Corpus statistics and vocabulary pruning on a sparse term matrix.
+
+TermMatrix replaces the gensim.corpora.Dictionary passes of LSA_LDA: the
+documents (lists of tokens) are read once into a documents x terms CSR
+matrix, then document frequencies and filter_extremes() are computed with
+NumPy on the matrix, so that trying other thresholds does not need another
+doc2bow pass over the documents.
+
+    tm = TermMatrix.from_documents(lem_abstract_withtitles)
+    tm = tm.filter_extremes(no_below=5, no_above=0.25, keep_n=None)
+    bows_csc = tm.to_csc()
+    lsimodel = LsiModel(tfidfmodel[Sparse2Corpus(bows_csc)], id2word=tm.id2word())
+"""
+import numpy as np
+from scipy import sparse
+
+__all__ = ['TermMatrix']
+
+
+class TermMatrix:
+    """Occurrences of the terms `id2token` in documents, as a
+    (documents, terms) scipy.sparse CSR matrix of counts.
+    """
+    def __init__(self, matrix, id2token):
+        self.matrix = matrix
+        self.id2token = list(id2token)
+        self._token2id = None
+
+    @classmethod
+    def from_documents(cls, documents):
+        "Term ids are given in order of first occurrence"
+        token2id = {}
+        indptr = [0]
+        indices = []
+        for tokens in documents:
+            indices.extend(token2id.setdefault(token, len(token2id)) for token in tokens)
+            indptr.append(len(indices))
+        indices = np.array(indices, dtype=np.int32)
+        data = np.ones(len(indices), dtype=np.int32)
+        matrix = sparse.csr_matrix((data, indices, np.array(indptr, dtype=np.int64)),
+                                   shape=(len(indptr) - 1, len(token2id)))
+        matrix.sum_duplicates() # Counts repeated tokens, sorts the indices
+        return cls(matrix, token2id)
+
+    @property
+    def num_docs(self):
+        return self.matrix.shape[0]
+
+    @property
+    def num_terms(self):
+        return self.matrix.shape[1]
+
+    @property
+    def token2id(self):
+        if self._token2id is None:
+            self._token2id = {token: i for i, token in enumerate(self.id2token)}
+        return self._token2id
+
+    def id2word(self):
+        "Mapping of term ids to tokens, for the id2word arguments of gensim"
+        return dict(enumerate(self.id2token))
+
+    def dfs(self):
+        "Number of documents of each term"
+        return np.bincount(self.matrix.indices, minlength=self.num_terms)
+
+    def cfs(self):
+        "Number of occurrences of each term"
+        return np.bincount(self.matrix.indices, weights=self.matrix.data,
+                           minlength=self.num_terms).astype(np.int64)
+
+    def keep_mask(self, no_below=5, no_above=0.5, keep_n=100000, keep_tokens=None, dfs=None):
+        """Boolean mask of the terms kept by filter_extremes(), same
+        semantics as gensim's Dictionary.filter_extremes: terms in less than
+        `no_below` documents or more than a `no_above` fraction of the
+        documents are removed, then only the `keep_n` most frequent terms
+        are kept (all if None). `keep_tokens` are always kept.
+        """
+        if dfs is None:
+            dfs = self.dfs()
+        mask = (dfs >= no_below) & (dfs <= int(no_above * self.num_docs))
+        if keep_tokens:
+            token2id = self.token2id
+            mask[[token2id[token] for token in keep_tokens if token in token2id]] = True
+        if keep_n is not None and mask.sum() > keep_n:
+            kept = np.flatnonzero(mask)
+            # Stable sort: ties are broken by term id
+            kept = kept[np.argsort(-dfs[kept], kind='stable')[:keep_n]]
+            mask[:] = False
+            mask[kept] = True
+        return mask
+
+    def select_terms(self, mask):
+        """TermMatrix of the terms in the boolean `mask`, renumbered in order.
+        Columns are removed by remapping the CSR indices: the matrix is not
+        converted nor copied column by column.
+        """
+        new_ids = np.full(self.num_terms, -1, dtype=np.int32)
+        new_ids[mask] = np.arange(np.count_nonzero(mask), dtype=np.int32)
+
+        m = self.matrix
+        indices = new_ids[m.indices]
+        kept = indices >= 0
+        rows = np.repeat(np.arange(self.num_docs), np.diff(m.indptr))
+        indptr = np.zeros(self.num_docs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[kept], minlength=self.num_docs), out=indptr[1:])
+        matrix = sparse.csr_matrix((m.data[kept], indices[kept], indptr),
+                                   shape=(self.num_docs, len(new_ids[mask])))
+        id2token = [token for token, keep in zip(self.id2token, mask) if keep]
+        return type(self)(matrix, id2token)
+
+    def filter_extremes(self, no_below=5, no_above=0.5, keep_n=100000, keep_tokens=None):
+        "New TermMatrix pruned as gensim's Dictionary.filter_extremes, see keep_mask()"
+        return self.select_terms(self.keep_mask(no_below, no_above, keep_n, keep_tokens))
+
+    def to_csc(self, dtype=np.float64):
+        "(terms, documents) CSC matrix, as built by gensim.matutils.corpus2csc"
+        return self.matrix.T.astype(dtype).tocsc()
+
+    def to_dictionary(self):
+        "gensim Dictionary of the terms, for TfidfModel(dictionary=...)"
+        from gensim.corpora import Dictionary
+        dictionary = Dictionary()
+        dictionary.token2id = dict(self.token2id)
+        dictionary.dfs = dict(enumerate(self.dfs().tolist()))
+        dictionary.cfs = dict(enumerate(self.cfs().tolist()))
+        dictionary.num_docs = self.num_docs
+        dictionary.num_nnz = self.matrix.nnz
+        dictionary.num_pos = int(self.matrix.data.sum())
+        return dictionary
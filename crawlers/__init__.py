@@ -1,2 +1,19 @@
-from .pubmed import pubmed_authorsearch
-from .hal import hal_authorsearch
+# Crawlers are imported on first use, not to slow down the start of the
+# processes only needing one of them (eg. the workers of import_baseline)
+_submodules = {'pubmed_authorsearch': 'pubmed',
+               'hal_authorsearch': 'hal',
+               'import_baseline': 'pubmed_baseline'}
+
+__all__ = list(_submodules)
+
+def __getattr__(name):
+    submodule = _submodules.get(name)
+    if submodule is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    from importlib import import_module
+    value = getattr(import_module('.' + submodule, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_submodules))
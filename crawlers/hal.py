@@ -1,8 +1,7 @@
 import json
 from urllib.parse import urlencode
-import dateutil.parser as dateparser
 
-from bibdb import Author, Ref, RefJournal, RefBook, Publication, clean_pii
+from bibdb import Author, Ref, RefJournal, RefBook, Publication, LazyPublication, clean_pii
 
 import logging
 logger = logging.getLogger(__name__)
@@ -49,7 +48,27 @@ def getids(record):
     return ids
 
 
-def hal_authorsearch(get, author):
+def record_refs(record):
+    "refs, en_abstract and fr_abstract arguments of Publication for a HAL record"
+    refs = getids(record)
+
+    en_abstract = record.get('en_abstract_s')
+    if en_abstract is not None:
+        en_abstract = ' '.join(en_abstract)
+
+    fr_abstract = record.get('fr_abstract_s')
+    if fr_abstract is not None:
+        fr_abstract = ' '.join(fr_abstract)
+
+    return refs, en_abstract, fr_abstract
+
+
+def record_date(record):
+    import dateutil.parser as dateparser # Slow import, only needed when parsing
+    return dateparser.parse(record['producedDate_tdate'])
+
+
+def hal_authorsearch(get, author, lazy=False):
     assert isinstance(author, Author)
 
     query = {'authFullName_t': str(author)}
@@ -78,21 +97,12 @@ def hal_authorsearch(get, author):
     if 'response' not in r:
         print(r)
     for record in r['response']['docs']:
-        authors = [Author(author) for author in record['authFullName_s']]
+        authors = Author.from_many(record['authFullName_s'])
         if not author in authors:
             continue
 
-        refs = getids(record)
-        date = dateparser.parse(record['producedDate_tdate'])
-
-        en_abstract = record.get('en_abstract_s')
-        if en_abstract is not None:
-            en_abstract = ' '.join(en_abstract)
-
-        fr_abstract = record.get('fr_abstract_s')
-        if fr_abstract is not None:
-            fr_abstract = ' '.join(fr_abstract)
         doctype = record.get('docType_s', 'UNDEFINED')
-
-        yield Publication(doctype, authors, date, refs, en_abstract=en_abstract, fr_abstract=fr_abstract)
-
+        if lazy:
+            yield LazyPublication(doctype, authors, record, record_refs, record_date)
+        else:
+            yield Publication(doctype, authors, record_date(record), *record_refs(record))
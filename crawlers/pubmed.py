@@ -3,7 +3,7 @@ from urllib.parse import urlencode
 from datetime import datetime
 from xml.etree import ElementTree as ET
 
-from bibdb import Author, Ref, RefJournal, Publication, clean_pii
+from bibdb import Author, Ref, RefJournal, Publication, LazyPublication, clean_pii
 
 import logging
 logger = logging.getLogger(__name__)
@@ -37,7 +37,7 @@ def esearch(get, term):
     return res['idlist']
 
 
-def efetch(get, pubmedid):
+def efetch(get, pubmedid, lazy=False):
     url = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?' + urlencode([
                 ('id', pubmedid),
                 ('db', 'pubmed'),
@@ -49,23 +49,24 @@ def efetch(get, pubmedid):
     if medart is None:
         return None # TODO: handle books
 
-    medcite = medart.find('MedlineCitation')
-    article = medcite.find('Article')
-    journal = article.find('Journal')
-    language = article.find('Language').text
+    return parse_article(medart, lazy)
 
-    created = medcite.find('DateCreated')
-    created = datetime(int(created.find('Year').text),
-                    int(created.find('Month').text),
-                    int(created.find('Day').text))
 
-    pubtypes = [pubtype.text for pubtype in article.findall('PublicationTypeList/PublicationType')]
-    if 'Journal Article' in pubtypes or 'Introductory Journal Article' in pubtypes:
-        pubtype = 'ART'
-    elif 'Case Reports' in pubtypes:
-        pubtype = 'REPORT'
-    else:
-        pubtype = 'OTHER'
+def article_date(medart):
+    # DateCreated is no longer in recent records (eg. baseline files)
+    for tag in ('DateCreated', 'DateCompleted', 'DateRevised'):
+        created = medart.find('MedlineCitation/' + tag)
+        if created is not None:
+            return datetime(int(created.find('Year').text),
+                            int(created.find('Month').text),
+                            int(created.find('Day').text))
+    return None
+
+
+def article_refs(medart):
+    "refs, en_abstract and fr_abstract arguments of Publication for a <PubmedArticle>"
+    article = medart.find('MedlineCitation/Article')
+    journal = article.find('Journal')
 
     refs = []
     for article_id in medart.findall('PubmedData/ArticleIdList/ArticleId'):
@@ -103,7 +104,21 @@ def efetch(get, pubmedid):
 
         refs.append(RefJournal(journaltitle, issn, issue, volume, pages))
 
-    authors = []
+    return refs, en_abstract, fr_abstract
+
+
+def article_pubtype(article):
+    pubtypes = [pubtype.text for pubtype in article.findall('PublicationTypeList/PublicationType')]
+    if 'Journal Article' in pubtypes or 'Introductory Journal Article' in pubtypes:
+        return 'ART'
+    elif 'Case Reports' in pubtypes:
+        return 'REPORT'
+    else:
+        return 'OTHER'
+
+
+def article_authors(article):
+    names = []
     for auth in article.findall('AuthorList/Author'):
         lname = getattr(auth.find('LastName'), 'text', None)
         fname = getattr(auth.find('ForeName'), 'text', None)
@@ -112,18 +127,34 @@ def efetch(get, pubmedid):
             if auth.find('CollectiveName') is None:
                 logger.warn('Invalid Author format: %s', ET.tostring(auth, 'utf-8').decode('utf-8'))
             continue
-        authors.append(Author(lname, fname, initials))
+        names.append((lname, fname, initials))
+    return Author.from_many(names)
+
+
+def parse_article(medart, lazy=False, authors=None):
+    "Publication of a <PubmedArticle> element, `authors` being article_authors() if known"
+    article = medart.find('MedlineCitation/Article')
+    pubtype = article_pubtype(article)
+    if authors is None:
+        authors = article_authors(article)
 
     #meshs = [e.text for e in medcite.findall('MeshHeadingList/MeshHeading/DescriptorName')]
 
     #keywords = [kw.text for kw in medcite.findall('KeywordList/Keyword')]
 
-    pub = Publication(pubtype, authors, created, refs, en_abstract, fr_abstract)
+    if lazy:
+        return LazyPublication(pubtype, authors, medart, article_refs, article_date)
+    else:
+        return Publication(pubtype, authors, article_date(medart), *article_refs(medart))
+
+
+def parse_xml(data, lazy=False):
+    "Publications of the <PubmedArticle> elements of an efetch response or of a baseline file"
+    return [parse_article(medart, lazy) for medart in ET.fromstring(data).iter('PubmedArticle')]
 
-    return pub
 
-def pubmed_authorsearch(get, author):
+def pubmed_authorsearch(get, author, lazy=False):
     for pmid in esearch(get, author):
-        pub = efetch(get, pmid)
+        pub = efetch(get, pmid, lazy)
         if pub is not None and author in pub.authors:
             yield pub
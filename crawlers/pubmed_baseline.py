@@ -0,0 +1,118 @@
+"""Bulk import of PubMed baseline files.
+
+NCBI publishes the whole PubMed database as gzipped XML files
+(https://ftp.ncbi.nlm.nih.gov/pubmed/baseline/). Querying E-utilities per
+author is the bottleneck of big crawls: import_baseline() instead streams
+the files, one per worker process, keeping the articles from a set of
+target authors. Articles are parsed with the field mapping of efetch.
+
+    pdb.add_pubs(import_baseline(glob('baseline/*.xml.gz'), profs))
+"""
+from collections import defaultdict
+from functools import lru_cache
+import gzip
+from multiprocessing import Pool
+from xml.etree import ElementTree as ET
+
+from bibdb import re_notalphanum, remove_accents
+from .pubmed import article_authors, parse_article
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['AuthorIndex', 'iter_articles', 'import_file', 'import_baseline']
+
+
+@lru_cache(maxsize=65536)
+def _norm_lname(lname, fname):
+    """Normalization of a LastName, as done by Author: without ForeName,
+    only the last word is kept
+    """
+    lname = re_notalphanum.sub(' ', lname)
+    if fname is None and ' ' in lname:
+        lname = lname.rpartition(' ')[2]
+    return remove_accents(lname).title()
+
+
+class AuthorIndex:
+    """Target Authors indexed by last name.
+
+    Author.lname is the normalized LastName, possibly prefixed by particles
+    from the ForeName (Van, De...): the last names of the targets are also
+    indexed by their word suffixes, so that articles can be rejected on the
+    raw LastNames before building any Author.
+    """
+    def __init__(self, authors):
+        self.by_lname = defaultdict(list)
+        self.lname_suffixes = set()
+        for author in authors:
+            self.by_lname[author.lname].append(author)
+            parts = author.lname.split(' ')
+            for i in range(len(parts)):
+                self.lname_suffixes.add(' '.join(parts[i:]))
+
+    def may_match(self, names):
+        "Whether an article with these raw (LastName, ForeName) may have a target author"
+        suffixes = self.lname_suffixes
+        return any(_norm_lname(lname, fname) in suffixes for lname, fname in names)
+
+    def match(self, authors):
+        "Whether any of `authors` is equal to a target author"
+        for author in authors:
+            for target in self.by_lname.get(author.lname, ()):
+                if author == target:
+                    return True
+        return False
+
+
+def iter_articles(file_name):
+    "Stream the <PubmedArticle> elements of a (gzipped) PubMed XML file"
+    opener = gzip.open if file_name.endswith('.gz') else open
+    with opener(file_name, 'rb') as f:
+        root = None
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if root is None:
+                root = elem
+            elif event == 'end' and elem.tag == 'PubmedArticle':
+                yield elem
+                root.clear() # Drop parsed articles
+
+
+def import_file(file_name, index):
+    "Publications of a PubMed XML file with an author from the AuthorIndex"
+    pubs = []
+    narticles = 0
+    for medart in iter_articles(file_name):
+        narticles += 1
+        names = [(lname.text, getattr(auth.find('ForeName'), 'text', None))
+                 for auth in medart.iterfind('MedlineCitation/Article/AuthorList/Author')
+                 for lname in [auth.find('LastName')] if lname is not None and lname.text]
+        if not index.may_match(names):
+            continue
+        authors = article_authors(medart.find('MedlineCitation/Article'))
+        if index.match(authors):
+            pubs.append(parse_article(medart, authors=authors))
+    logger.info('%d/%d articles kept from %r', len(pubs), narticles, file_name)
+    return pubs
+
+
+# Worker processes of import_baseline() receive the index once
+_index = None
+
+def _init_worker(index):
+    global _index
+    _index = index
+
+def _import_file(file_name):
+    return import_file(file_name, _index)
+
+
+def import_baseline(file_names, authors, workers=None):
+    """Yield the Publications of the given PubMed files having one of
+    `authors`, parsing one file per worker process (default: CPU count).
+    Publications are yielded in the order of the files.
+    """
+    index = AuthorIndex(authors)
+    with Pool(workers, initializer=_init_worker, initargs=(index,)) as pool:
+        for pubs in pool.imap(_import_file, file_names):
+            yield from pubs
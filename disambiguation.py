@@ -0,0 +1,255 @@
+"""Batch author disambiguation of a PubDB.
+
+Author.__eq__ is fuzzy and not transitive: the Authors of author_pubs depend
+on the order the publications were added in, and homonyms with compatible
+first names are merged. disambiguate() clusters again the author mentions,
+the names of the authors of each publication as found in its records (see
+PubDB.add_pub), per last name block, using:
+- name compatibility (the rules of Author.__eq__, checked between all the
+  mentions of a cluster),
+- evidence: the number of co-author last names and venues (journal and book
+  titles) two mentions or clusters share.
+
+Mentions with a first name are clustered first, merging the pairs of
+mentions with the most evidence first. Mentions without first name (initials
+only) are then attached to the compatible cluster with the most evidence,
+or clustered among themselves. Mentions are sorted and ties broken on the
+names, titles and features, so the clusters do not depend on the order the
+publications were added in. Candidate pairs, and clusters of the mentions
+without first name, must share a feature, and features shared by more than
+`max_feature_mentions` mentions of a block are ignored, which bounds the
+cost of big blocks.
+
+Blocks are clustered in worker processes, then author_pubs and the authors
+of the publications are rewritten once with AuthorCluster keys. These are
+only equal to themselves: authors are then looked up by name with
+clusters_of() and pubs_of(), pdb.author_pubs[author] adding a new empty key.
+"""
+from collections import defaultdict
+from multiprocessing import Pool
+
+from bibdb import Author
+from lattice_containers import DeduplicatedKeysDictOfSets, DeduplicatedSet
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['AuthorCluster', 'disambiguate', 'clusters_of', 'pubs_of']
+
+
+class AuthorCluster(Author):
+    """Author resolved by disambiguate(), from the Authors in `mentions`.
+    Only equal to itself, so that homonyms stay distinct in author_pubs.
+    """
+    def __init__(self, lname, fname, fname_initials, mentions):
+        self.lname, self.fname, self.fname_initials = lname, fname, fname_initials
+        self.mentions = mentions
+
+    __repr__ = lambda self: '<AuthorCluster %s (%s.) %s, %d mentions>' % (
+        self.fname, self.fname_initials, self.lname, len(self.mentions))
+
+    def __eq__(self, other):
+        return self is other
+
+    def __ior__(self, other):
+        return self
+
+    __hash__ = object.__hash__
+
+
+def _compatible(a, b):
+    "Author.__eq__ on (fname, fname_initials) of a same last name"
+    if a[0] and b[0]:
+        return a[0] == b[0] or bool(set(a[0].split(' ')) & set(b[0].split(' ')))
+    elif a[1] and b[1]:
+        return bool(set(a[1]) & set(b[1]))
+    return True
+
+
+def _cluster_block(args):
+    """Cluster the mentions of a block, given as (key, fname, fname_initials,
+    features) tuples. Returns the clusters as lists of mention indices.
+    """
+    mentions, min_evidence, max_feature_mentions = args
+    order = sorted(range(len(mentions)), key=lambda i: mentions[i][0])
+    names = [mentions[i][1:3] for i in order]
+    features = [mentions[i][3] for i in order]
+    strong = [i for i in range(len(order)) if names[i][0]]
+    weak = [i for i in range(len(order)) if not names[i][0]]
+
+    postings = defaultdict(list)
+    for i, feats in enumerate(features):
+        for feature in feats:
+            postings[feature].append(i)
+
+    cluster = list(range(len(order))) # Mention -> cluster (its smallest mention)
+    members = {i: [i] for i in range(len(order))}
+    cluster_names = {i: {names[i]} for i in range(len(order))} # Distinct names of a cluster
+    compatible_names = {}
+
+    def compatible(c1, c2):
+        for a in cluster_names[c1]:
+            for b in cluster_names[c2]:
+                ok = compatible_names.get((a, b))
+                if ok is None:
+                    ok = compatible_names[a, b] = _compatible(a, b)
+                if not ok:
+                    return False
+        return True
+
+    def merge(c1, c2):
+        if c2 < c1:
+            c1, c2 = c2, c1
+        for i in members[c2]:
+            cluster[i] = c1
+        members[c1].extend(members.pop(c2))
+        cluster_names[c1] |= cluster_names.pop(c2)
+
+    def agglomerate(candidates):
+        "Merge the clusters of candidate pairs, most evidence first"
+        selected = set(candidates)
+        shared = defaultdict(int)
+        for ids in postings.values():
+            if len(ids) > max_feature_mentions:
+                continue
+            ids = [i for i in ids if i in selected]
+            for n, i in enumerate(ids):
+                for j in ids[n + 1:]:
+                    shared[i, j] += 1
+        pairs = sorted(((-n, i, j) for (i, j), n in shared.items() if n >= min_evidence))
+        for n, i, j in pairs:
+            c1, c2 = cluster[i], cluster[j]
+            if c1 != c2 and compatible(c1, c2):
+                merge(c1, c2)
+
+    agglomerate(strong)
+
+    # Weak mentions: attached to the strong cluster with the most evidence
+    # (independently of each other: the strong clusters are not updated)
+    is_strong = set(strong)
+    attached = []
+    unattached = []
+    for i in weak:
+        shared = defaultdict(int)
+        for feature in features[i]:
+            ids = postings[feature]
+            if len(ids) <= max_feature_mentions:
+                for c in {cluster[j] for j in ids if j in is_strong}:
+                    shared[c] += 1
+        best = None
+        best_evidence = min_evidence - 1
+        for c in sorted(shared):
+            if shared[c] > best_evidence and compatible(i, c):
+                best, best_evidence = c, shared[c]
+        if best is None:
+            unattached.append(i)
+        else:
+            attached.append((i, best))
+    for i, c in attached:
+        members[c].append(i)
+        cluster[i] = c
+        del members[i]
+    agglomerate(unattached)
+
+    return [[order[i] for i in sorted(members[c])] for c in sorted(members)]
+
+
+def _pub_mentions(pub):
+    "(lname, fname, fname_initials) of the authors of a publication, as in its records"
+    mentions = getattr(pub, 'author_mentions', None)
+    if mentions is None: # Not added by PubDB.add_pub
+        mentions = dict.fromkeys((a.lname, a.fname, a.fname_initials) for a in pub.authors)
+    return list(mentions)
+
+
+def _mention_author(name):
+    author = Author.__new__(Author)
+    author.lname, author.fname, author.fname_initials = name
+    return author
+
+
+def _cluster_author(mentions):
+    "AuthorCluster of mentions sorted as in _cluster_block"
+    fnames = [m.fname for m in mentions if m.fname]
+    initials = [m.fname_initials for m in mentions if m.fname_initials]
+    # Most complete names, as in Author.__ior__
+    fname = max(fnames, key=lambda n: len(n.split()), default=None)
+    fname_initials = max(initials, key=len, default=None)
+    return AuthorCluster(mentions[0].lname, fname, fname_initials, mentions)
+
+
+def disambiguate(pdb, workers=None, min_evidence=1, max_feature_mentions=100):
+    """Cluster the author mentions of `pdb`, see the module documentation,
+    clustering blocks in `workers` processes (default: CPU count, 1 for no
+    process). pdb.author_pubs and the authors of the publications are
+    replaced by AuthorClusters, which are returned.
+    """
+    pubs = {id(pub): pub for pubs in pdb.author_pubs.values() for pub in pubs}
+    pub_mentions = {}
+    blocks = defaultdict(list) # lname -> (name, pub, features, sort key)
+    for i, pub in pubs.items():
+        names = pub_mentions[i] = _pub_mentions(pub)
+        venues = {(ref.reftype, ref.ref) for ref in pub.refs if ref.reftype in ('journal', 'book')}
+        lnames = {name[0] for name in names}
+        # Ties between mentions of a same name are broken on their publication
+        pub_key = (sorted(pub.titles), sorted(lnames), sorted(map(repr, venues)))
+        for name in names:
+            features = frozenset(venues.union(('coauthor', lname) for lname in lnames
+                                              if lname != name[0]))
+            blocks[name[0]].append((name, pub, features, (name[1] or '', name[2] or '', pub_key)))
+    lnames = sorted(blocks)
+
+    tasks = []
+    for lname in lnames:
+        tasks.append(([(key, name[1], name[2], features)
+                       for name, pub, features, key in blocks[lname]],
+                      min_evidence, max_feature_mentions))
+
+    if workers == 1:
+        results = map(_cluster_block, tasks)
+    else:
+        pool = Pool(workers)
+        results = pool.imap(_cluster_block, tasks, chunksize=16)
+
+    clusters = []
+    mention_cluster = {}
+    new_author_pubs = DeduplicatedKeysDictOfSets()
+    try:
+        for lname, result in zip(lnames, results):
+            block = blocks[lname]
+            for indices in result:
+                cluster = _cluster_author([_mention_author(block[i][0]) for i in indices])
+                clusters.append(cluster)
+                for i in indices:
+                    name, pub = block[i][:2]
+                    mention_cluster[id(pub), name] = cluster
+                    new_author_pubs[cluster] = pub
+    finally:
+        if workers != 1:
+            pool.close()
+            pool.join()
+
+    # Publications authors, in the order of their records
+    for i, pub in pubs.items():
+        pub.authors = DeduplicatedSet(mention_cluster[i, name] for name in pub_mentions[i])
+
+    pdb.author_pubs = new_author_pubs
+    logger.info('Disambiguated %d author mentions into %d clusters',
+                len(mention_cluster), len(clusters))
+    return clusters
+
+
+def clusters_of(pdb, author):
+    "AuthorClusters of a disambiguated `pdb` whose name is compatible with `author`"
+    return [cluster for cluster in pdb.author_pubs
+            if cluster.lname == author.lname and Author.__eq__(cluster, author)]
+
+
+def pubs_of(pdb, author):
+    """Publications of the AuthorClusters of `author`, as pdb.author_pubs[author]
+    before disambiguate() (which would now add `author` as a new key)
+    """
+    pubs = set()
+    for cluster in clusters_of(pdb, author):
+        pubs |= pdb.author_pubs.get(cluster)
+    return pubs
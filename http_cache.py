@@ -7,6 +7,8 @@ import gzip
 import pickle
 import datetime
 
+from metrics import metrics
+
 __all__ = ['HTTPCache']
 
 logger = logging.getLogger(__name__)
@@ -51,9 +53,16 @@ class HTTPCache:
             if data is not None:
                 data, date = data
                 if date > datetime.datetime.now() - datetime.timedelta(days=invalidate_days):
+                    if metrics.enabled:
+                        metrics.incr('http_cache.hit')
                     return gzip.decompress(data)
+                elif metrics.enabled:
+                    metrics.incr('http_cache.expired')
 
-        data, compressed = self._urlopen(url, **kwargs)
+        if metrics.enabled:
+            metrics.incr('http_cache.miss')
+        with metrics.timer('http_cache.fetch_seconds'):
+            data, compressed = self._urlopen(url, **kwargs)
         self.cache[key] = (compressed, datetime.datetime.now())
         return data
 
@@ -0,0 +1,50 @@
+"""Multi-process ingestion of raw records into a PubDB.
+
+Parsing the records (PubMed XML, archived crawler responses...) costs about
+as much as PubDB.add_pub. ingest() parses them in worker processes while the
+calling process adds the publications, in the order of the records: the
+database is the one of a sequential ingestion, whatever the number of
+workers.
+
+Merges stay in the calling process: Author merges update the author_pubs
+keys in place and depend on the order of all the publications, so shards of
+publications deduplicated separately do not give the same database.
+
+    ingest(pdb, efetch_bodies, crawlers.pubmed.parse_xml, workers=4)
+"""
+from multiprocessing import Pool
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['ingest']
+
+
+def ingest(pdb, records, parse, workers=None, chunk_size=64, initializer=None, initargs=()):
+    """add_pub() the Publications of parse(record), a list, for each of
+    `records`, parsing them in `workers` processes (default: CPU count, 1 for
+    no process) initialized by initializer(*initargs). `parse` and the
+    records are sent to the workers by pickling: `parse` must be a module
+    level function. Returns the number of publications added.
+    """
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        results = map(parse, records)
+    else:
+        pool = Pool(workers, initializer=initializer, initargs=initargs)
+        results = pool.imap(parse, records, chunksize=chunk_size)
+
+    npubs = 0
+    try:
+        # Publications are added while the next records are parsed
+        for pubs in results:
+            for pub in pubs:
+                pdb.add_pub(pub)
+            npubs += len(pubs)
+    finally:
+        if workers != 1:
+            pool.close()
+            pool.join()
+    logger.info('Ingested %d publications', npubs)
+    return npubs
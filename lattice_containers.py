@@ -1,46 +1,238 @@
-from collections import defaultdict
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from collections.abc import Set
+import weakref
+
+_INTERVAL = object() # Tags keys stored in an IntervalIndex
+_SHADOWED = object() # Tags unpickled keys equal to a key restored before them
 
 dict_keys = type(dict().keys())
 def norm_to_set(x):
     """Normalize an iterable object (dict, set, DeduplicatedSet, list, etc) to
     an object supporting set operations (dict_keys, set).
     """
-    if isinstance(x, (set, dict_keys)):
+    if isinstance(x, (set, dict_keys, DeduplicatedKeysView)):
         return x
     elif isinstance(x, (dict, DeduplicatedSet)):
         return x.keys()
     else:
         return set(x)
 
+class IntervalIndex:
+    """Keys having an interval (start, end), equal to other keys only when
+    they share a start, share an end, or when one interval contains the other
+    (containment only being tested on integer bounds).
+    find() returns the first inserted key equal to a key, as the lookup of a
+    dict bucket, in logarithmic time plus the scan of the stored intervals
+    starting less than the longest interval length before the searched one.
+    Keys are indexed by id() under their interval: a key merged by any
+    container is reindexed in all the IntervalIndexes holding it (reindex()).
+    """
+    _holders = defaultdict(list) # id(key) -> weakrefs of the IntervalIndexes holding it
+
+    def __init__(self):
+        self._entries = dict() # id(key) -> (seq, start, end, key)
+        self._starts = defaultdict(list) # start -> ids
+        self._ends = defaultdict(list) # end -> ids
+        self._sorted = [] # (start, seq, id) of integer intervals, sorted
+        self._maxlen = 0
+        self._seq = 0
+        self._ref = weakref.ref(self)
+        weakref.finalize(self, IntervalIndex._forget, self._ref, self._entries)
+
+    @staticmethod
+    def _forget(ref, entries):
+        for i in entries:
+            IntervalIndex._remove_id(IntervalIndex._holders, i, ref)
+
+    @classmethod
+    def reindex(cls, key):
+        "Reindex a key whose interval may have changed (eg. by a merge) in all its indexes"
+        for ref in cls._holders.get(id(key), ()):
+            ref().refresh(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return id(key) in self._entries
+
+    def _candidates(self, start, end):
+        candidates = set()
+        if start is not None:
+            candidates.update(self._starts.get(start, ()))
+        if end is not None:
+            candidates.update(self._ends.get(end, ()))
+        if type(start) is int and type(end) is int:
+            # Containing intervals start from end - maxlen, contained ones before end
+            lo = bisect_left(self._sorted, (min(start, end - self._maxlen),))
+            hi = bisect_right(self._sorted, (end, float('inf')))
+            candidates.update(i for s, seq, i in self._sorted[lo:hi])
+        return candidates
+
+    def find(self, key):
+        if id(key) in self._entries:
+            self.refresh(key)
+
+        found = None
+        found_seq = None
+        for i in self._candidates(*key.interval()):
+            seq, start, end, stored = self._entries[i]
+            if (found is None or seq < found_seq) and stored == key:
+                found, found_seq = stored, seq
+        return found
+
+    def add(self, key, seq=None):
+        if seq is None:
+            self._seq += 1
+            seq = self._seq
+        start, end = key.interval()
+        i = id(key)
+        self._entries[i] = (seq, start, end, key)
+        IntervalIndex._holders[i].append(self._ref)
+        if start is not None:
+            self._starts[start].append(i)
+        if end is not None:
+            self._ends[end].append(i)
+        if type(start) is int and type(end) is int:
+            insort(self._sorted, (start, seq, i))
+            self._maxlen = max(self._maxlen, end - start)
+
+    def discard(self, key):
+        i = id(key)
+        entry = self._entries.pop(i, None)
+        if entry is None:
+            return None
+        IntervalIndex._remove_id(IntervalIndex._holders, i, self._ref)
+        seq, start, end, key = entry
+        if start is not None:
+            self._remove_id(self._starts, start, i)
+        if end is not None:
+            self._remove_id(self._ends, end, i)
+        if type(start) is int and type(end) is int:
+            pos = bisect_left(self._sorted, (start, seq, i))
+            del self._sorted[pos]
+        return entry
+
+    @staticmethod
+    def _remove_id(table, value, i):
+        ids = table[value]
+        ids.remove(i)
+        if not ids:
+            del table[value]
+
+    def refresh(self, key):
+        "Reindex a key of this index whose interval may have changed"
+        seq, start, end, key = self._entries[id(key)]
+        if (start, end) != key.interval():
+            self.discard(key)
+            self.add(key, seq)
+
+
+class DeduplicatedKeysView(Set):
+    """Live view of the keys of a DeduplicatedSet, as keys() of a
+    DeduplicatedSet having interval keys: membership uses its indexes.
+    Set operations return sets of its keys, like dict_keys.
+    """
+    def __init__(self, dset):
+        self._dset = dset
+
+    def __len__(self):
+        return len(self._dset)
+
+    def __iter__(self):
+        return iter(self._dset)
+
+    def __contains__(self, key):
+        return self._dset._find(key) is not None
+
+    @classmethod
+    def _from_iterable(cls, it):
+        return set(it)
+
+    def __and__(self, other):
+        if not isinstance(other, Set):
+            other = set(other)
+        if len(other) < len(self):
+            found = (self._dset._find(k) for k in other)
+            return {k for k in found if k is not None}
+        return {k for k in self if k in other}
+    __rand__ = __and__
+
+
 class DeduplicatedSet:
     """A set with values on a lattice.
     Two keys may be equal but contains different quantity of information.
     add() will call __ior__ on the existing keys to augment its information content.
     Once a key is fisrt defined in the set, it will never be replaced, but may be updated.
     (ie. its id() never change)
+
+    Keys defining interval_block() and interval() (see IntervalIndex) are not
+    hashed: they are stored in an IntervalIndex per block, since their
+    equality on intervals would make them share a same big hash bucket.
     """
     def __init__(self, values=None):
-        self._keys = dict()
+        self._keys = dict() # key -> key, or (_INTERVAL or _SHADOWED, id(key)) -> key
+        self._intervals = dict() # block -> IntervalIndex
+        self._shadowed = False
         if values:
             self.update(values)
 
     def __contains__(self, key):
-        return self._keys.__contains__(key)
+        return self._find(key) is not None
+
+    def _find(self, k):
+        "Key equal to `k`, without merging `k` into it"
+        block = getattr(k, 'interval_block', None)
+        if block is None:
+            return self._keys.get(k)
+        index = self._intervals.get(block())
+        return index.find(k) if index is not None else None
 
     def __len__(self):
         return len(self._keys)
 
     def __iter__(self):
-        return iter(self._keys)
+        return iter(self._keys.values())
 
     def keys(self):
-        return self._keys.keys()
+        if self._intervals or self._shadowed:
+            return DeduplicatedKeysView(self)
+        else:
+            return self._keys.keys()
+
+    def bucket_sizes(self):
+        """Number of keys sharing each hash value, and number of keys of each
+        IntervalIndex block.
+        Equal keys must have equal hashes, so lookups scan a whole bucket
+        calling __eq__ on its keys: big buckets are linear time lookups.
+        """
+        sizes = Counter(hash(k) for t, k in self._keys.items()
+                        if not (type(t) is tuple and t and t[0] is _INTERVAL))
+        return list(sizes.values()) + [len(index) for index in self._intervals.values()]
+
+    def _set_new(self, k, block=None):
+        if block is None:
+            self._keys[k] = k
+        else:
+            index = self._intervals.get(block)
+            if index is None:
+                index = self._intervals[block] = IntervalIndex()
+            index.add(k)
+            self._keys[(_INTERVAL, id(k))] = k
 
     def get_dedupkey(self, k, or_set=False, default=None):
-        kfound = self._keys.get(k)
+        block = getattr(k, 'interval_block', None)
+        if block is None:
+            kfound = self._keys.get(k)
+        else:
+            block = block()
+            index = self._intervals.get(block)
+            kfound = index.find(k) if index is not None else None
+
         if kfound is None:
             if or_set:
-                self._keys[k] = k
+                self._set_new(k, block)
                 kfound = k
             else:
                 return default
@@ -48,13 +240,24 @@ class DeduplicatedSet:
             merge = getattr(kfound, '__ior__', None)
             if merge is not None:
                 merge(k)
+                if block is not None:
+                    IntervalIndex.reindex(kfound)
         return kfound
 
     def add(self, key):
-        return self.get_dedupkey(k, or_set=True)
+        return self.get_dedupkey(key, or_set=True)
 
     def remove(self, key):
-        return self._keys.pop(self, key)
+        kfound = self.get_dedupkey(key)
+        if kfound is None:
+            raise KeyError(key)
+        block = getattr(kfound, 'interval_block', None)
+        if block is None:
+            del self._keys[kfound]
+        else:
+            self._intervals[block()].discard(kfound)
+            del self._keys[(_INTERVAL, id(kfound))]
+        return kfound
 
     def update(self, other):
         keys = []
@@ -67,17 +270,42 @@ class DeduplicatedSet:
             self.get_dedupkey(k, or_set=True)
         return self
 
-    intersection = lambda self, other: self._keys.keys() & norm_to_set(other)
+    # Indexes refer to keys by id(): they are rebuilt when unpickling
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_keys'] = list(self)
+        del state['_intervals']
+        return state
+
+    def __setstate__(self, state):
+        keys = state.pop('_keys')
+        self.__dict__.update(state)
+        self._keys = dict()
+        self._intervals = dict()
+        self._shadowed = False
+        for k in keys:
+            block = getattr(k, 'interval_block', None)
+            if block is not None:
+                self._set_new(k, block())
+            elif k in self._keys:
+                # Made equal by merges after their insertion: both are kept,
+                # lookups finding the first one as before pickling
+                self._keys[(_SHADOWED, id(k))] = k
+                self._shadowed = True
+            else:
+                self._keys[k] = k
+
+    intersection = lambda self, other: self.keys() & norm_to_set(other)
     __and__ = intersection
     __rand__ = intersection
 
-    #union = lambda self, other: self._keys.keys() | norm_to_set(other)
+    #union = lambda self, other: self.keys() | norm_to_set(other)
     #__or__ = union
     #__ror__ = union
 
-    difference = lambda self, other: self._keys.keys() - norm_to_set(other)
+    difference = lambda self, other: self.keys() - norm_to_set(other)
     __sub__ = difference
-    __rsub__ = lambda self, other: norm_to_set(other) - self._keys.keys()
+    __rsub__ = lambda self, other: norm_to_set(other) - self.keys()
 
 class DeduplicatedKeysDict(DeduplicatedSet):
     """A dictionary with DeduplicatedSet keys
@@ -108,9 +336,25 @@ class DeduplicatedKeysDict(DeduplicatedSet):
         return self._values.values()
 
     def items(self):
-        for k in self._keys:
+        for k in self:
             yield k, self._values[id(k)]
 
+    def __getstate__(self):
+        state = DeduplicatedSet.__getstate__(self)
+        state['_values'] = [self._values[id(k)] for k in state['_keys']]
+        empty_values = self._values.copy() # Keeps defaultdict factories
+        empty_values.clear()
+        state['_empty_values'] = empty_values
+        return state
+
+    def __setstate__(self, state):
+        values = state.pop('_values')
+        self._values = state.pop('_empty_values')
+        keys = state['_keys']
+        DeduplicatedSet.__setstate__(self, state)
+        for k, v in zip(keys, values):
+            self._values[id(k)] = v
+
     def update(self, items):
         if isinstance(items, (DeduplicatedKeysDict, dict)):
             items = items.items()
@@ -0,0 +1,101 @@
+"""Counters and histograms for the hot paths of the crawl.
+
+Instrumented code guards every call with `if metrics.enabled:` so that
+disabled metrics only cost an attribute lookup:
+
+    from metrics import metrics
+    metrics.enable()
+    ... crawl ...
+    pdb.record_metrics()
+    metrics.dump('metrics.json')
+"""
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+import json
+import math
+import time
+
+__all__ = ['Histogram', 'Metrics', 'metrics']
+
+
+class Histogram:
+    "Summary statistics and power of two buckets of observed values"
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.buckets = Counter()
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        # Bucket b holds values in [2**(b-1), 2**b), so that both sizes and
+        # durations in seconds get a meaningful resolution
+        self.buckets[math.frexp(value)[1] if value > 0 else None] += 1
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {('<%g' % 2.0 ** b if b is not None else '<=0'): n
+                        for b, n in sorted(self.buckets.items(),
+                                           key=lambda item: (item[0] is not None, item[0] or 0))},
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.counters = Counter()
+        self.histograms = defaultdict(Histogram)
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def incr(self, name, n=1):
+        self.counters[name] += n
+
+    def observe(self, name, value):
+        self.histograms[name].observe(value)
+
+    @contextmanager
+    def timer(self, name):
+        "Observe the duration in seconds of the with block, when enabled"
+        if not self.enabled:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histograms[name].observe(time.perf_counter() - t0)
+
+    def as_dict(self):
+        return {
+            'counters': dict(sorted(self.counters.items())),
+            'histograms': {name: hist.as_dict() for name, hist in sorted(self.histograms.items())},
+        }
+
+    def dump(self, file_name):
+        with open(file_name, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+# Process wide instance used by the instrumented modules
+metrics = Metrics()
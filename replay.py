@@ -0,0 +1,134 @@
+"""Offline replay of recorded HTTP responses.
+
+A response archive is a data file holding the gzipped bodies one after the
+other, plus a `<data file>.index` JSON file mapping each URL to the offset
+and length of its body. ResponseArchive maps the data file in memory and
+its get() method can be passed to the crawlers in place of HTTPCache.get:
+
+    archive_http_cache('http_cache.pk', 'responses.bin')
+    pdb = reparse('responses.bin', profs, workers=8)
+"""
+import gzip
+import json
+import mmap
+import pickle
+
+from bibdb import PubDB
+from ingest import ingest
+
+import logging
+logger = logging.getLogger(__name__)
+
+__all__ = ['MissingResponse', 'ArchiveWriter', 'ResponseArchive', 'archive_http_cache', 'reparse']
+
+
+class MissingResponse(KeyError):
+    "The response of an URL is not in the archive"
+
+
+def _index_name(file_name):
+    return file_name + '.index'
+
+
+class ArchiveWriter:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.file = open(file_name, 'wb')
+        self.index = {}
+        self.offset = 0
+
+    def add(self, url, body, compressed=False):
+        "Append the body of `url`; already gzipped bodies are stored as is"
+        if not compressed:
+            body = gzip.compress(body)
+        self.file.write(body)
+        self.index[url] = (self.offset, len(body))
+        self.offset += len(body)
+
+    def close(self):
+        self.file.close()
+        with open(_index_name(self.file_name), 'w') as f:
+            json.dump(self.index, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ResponseArchive:
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(_index_name(file_name)) as f:
+            self.index = json.load(f)
+        with open(file_name, 'rb') as f:
+            if self.index:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else: # Empty files can't be mapped
+                self.data = b''
+
+    def get(self, url, key=None, **kwargs):
+        "Same signature as HTTPCache.get, raises MissingResponse for unrecorded URLs"
+        try:
+            offset, length = self.index[url if key is None else key]
+        except KeyError:
+            raise MissingResponse(url if key is None else key) from None
+        return gzip.decompress(self.data[offset:offset + length])
+
+    def __contains__(self, url):
+        return url in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def urls(self):
+        return self.index.keys()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+def archive_http_cache(cache_file, archive_file):
+    "Convert an HTTPCache pickle into a response archive"
+    with open(cache_file, 'rb') as f:
+        cache = pickle.load(f)
+    with ArchiveWriter(archive_file) as writer:
+        for url, (data, date) in cache.items():
+            writer.add(url, data, compressed=True)
+    logger.info('Archived %d responses from %r to %r', len(cache), cache_file, archive_file)
+
+
+# Worker processes of reparse() each map the archive once
+_archive = None
+
+def _open_archive(file_name):
+    global _archive
+    _archive = ResponseArchive(file_name)
+
+
+def _search(task):
+    from crawlers import hal_authorsearch, pubmed_authorsearch
+    search = {'hal': hal_authorsearch, 'pubmed': pubmed_authorsearch}[task[0]]
+    author = task[1]
+    try:
+        return list(search(_archive.get, author))
+    except MissingResponse as e:
+        logger.warning('Missing response %s while replaying %s search of %s', e, task[0], author)
+        return []
+
+
+def reparse(archive_file, authors, sources=('hal', 'pubmed'), workers=None, pdb=None):
+    """Replay the searches of `authors` on `sources` from a response archive,
+    parsing the responses in `workers` processes (default: CPU count).
+    The publications are added to `pdb` (default: a new PubDB) in the same
+    order as a sequential crawl, see ingest.
+    """
+    if pdb is None:
+        pdb = PubDB()
+    tasks = [(source, author) for author in authors for source in sources]
+    npubs = ingest(pdb, tasks, _search, workers, chunk_size=1,
+                   initializer=_open_archive, initargs=(archive_file,))
+    logger.info('Replayed %d searches, %d publications', len(tasks), npubs)
+    return pdb
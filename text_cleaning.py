@@ -1,21 +1,60 @@
 import re
-from nltk import word_tokenize, pos_tag
-from nltk.corpus import stopwords
-from nltk.stem.porter import PorterStemmer
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import wordnet
-
 from functools import lru_cache
 
+#
+# NLTK resources, loaded on first use: importing nltk alone takes about a
+# second, paid by every worker process importing this module.
+#
+
+_nltk_names = ('word_tokenize', 'pos_tag', 'stop_words', 'wordnet',
+               'wordnet_lemmatizer', 'tb2wn', 'porter_stemmer')
+_loaded = False
+
+def _load():
+    global _loaded, word_tokenize, pos_tag, stop_words, wordnet
+    global wordnet_lemmatizer, tb2wn, porter_stemmer
+    if _loaded:
+        return
+    from nltk import word_tokenize, pos_tag
+    from nltk.corpus import stopwords
+    from nltk.stem.porter import PorterStemmer
+    from nltk.stem import WordNetLemmatizer
+    from nltk.corpus import wordnet
+
+    stop_words = set(stopwords.words('english'))
+    wordnet_lemmatizer = WordNetLemmatizer()
+    # Penn Treebank tagger tags (first letter) to wordnet tag:
+    tb2wn = {'J': wordnet.ADJ,
+             'V': wordnet.VERB,
+             'N': wordnet.NOUN,
+             'R': wordnet.ADV}
+    porter_stemmer = PorterStemmer()
+    _loaded = True
+
+def prewarm():
+    """Load NLTK and its models (tokenizer, tagger, wordnet) now, eg. in the
+    initializer of worker processes: Pool(initializer=text_cleaning.prewarm)
+    """
+    _load()
+    pos_tag(word_tokenize('Warming up.'))
+    wordnet_lemmatizer.lemmatize('warming', pos=wordnet.VERB)
+
+def __getattr__(name):
+    if name in _nltk_names:
+        _load()
+        return globals()[name]
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
 #
 # Word cleaning : clean_word
 #
 
-stop_words = set(stopwords.words('english'))
 re_prohibited = re.compile("[ .,;:()\n\t\r]")
 re_number = re.compile(r"[-+]?\d+([\.,]\d+)?$")
 
 def clean_word(w):
+    if not _loaded:
+        _load()
     w = w.lower()
     if w in stop_words:
         return None
@@ -28,16 +67,11 @@ def clean_word(w):
 
 cached_clean_word = lru_cache(maxsize=4096)(clean_word)
 
-wordnet_lemmatizer = WordNetLemmatizer()
-# Penn Treebank tagger tags (first letter) to wordnet tag:
-tb2wn = {'J': wordnet.ADJ,
-         'V': wordnet.VERB,
-         'N': wordnet.NOUN,
-         'R': wordnet.ADV}
-
 
 @lru_cache(maxsize=4096)
 def clean_lematize_word(w, tag):
+    if not _loaded:
+        _load()
     wn_postag = tb2wn.get(tag[0], wordnet.NOUN)
     w = clean_word(w)
     if w is None:
@@ -49,12 +83,12 @@ def clean_lematize_word(w, tag):
 #
 # Main function : text_cleaning
 #
-porter_stemmer = PorterStemmer()
-
 #abstract => texte à traiter
 #option => stem or lem
 #namelist_output => sortie de traitement
 def text_cleaning(text, option='lem'):
+    if not _loaded:
+        _load()
     #tokenization
     output = word_tokenize(text)
 